@@ -0,0 +1,371 @@
+# backend/analytics.py
+"""Agregados incrementales de ``events`` para ``/api/stats``.
+
+En vez de recorrer ``events`` en cada consulta se mantienen tablas resumen en
+``edubot.db``:
+
+- ``events_rollup``: conteos por intervalo (minuto, hora, día; epoch UTC),
+  ``event_type``, ``intent`` y ``channel``.
+- ``questions_rollup``: preguntas por día, tipo (``sin_intent`` /
+  ``sin_respuesta``) y canal, agrupadas por su texto normalizado.
+- ``rollup_state``: marca con el último ``id`` de ``events`` ya procesado.
+
+Cada actualización solo lee los eventos con ``id`` mayor que la marca, por
+tramos, y confirma conteos y marca en la misma transacción (cada evento se
+cuenta una sola vez aunque haya varios procesos). Los intervalos de minuto se
+conservan ``minute_retention_days`` días.
+
+Las preguntas salen de la columna ``question`` de los eventos de respuesta
+(``message_received`` / ``ollama_answer``); los eventos anteriores a esa
+columna no entran en los rankings. ``sin_intent``: el detector de intents no
+la reconoció y respondió el modelo (o falló). ``sin_respuesta``: el usuario no
+recibió respuesta (intent ``error``, o ``fallback`` en eventos de antes de
+consultar al modelo).
+
+Desde la línea de comandos:
+    python analytics.py actualizar [--db edubot.db]
+    python analytics.py reconstruir [--db edubot.db]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+from textnorm import normalizar
+
+GRANULARITIES = {"minuto": 60, "hora": 3600, "dia": 86400}
+DEFAULT_CHUNK = 20000
+MAX_BUCKETS = 5000
+ANSWER_EVENTS = ("message_received", "ollama_answer")
+UNANSWERED_INTENTS = ("fallback", "error")
+# Intents que no vienen de una regla del detector (ver detect_intent)
+FALLBACK_INTENTS = ("fallback", "respuesta_directa", "error", "cancelado")
+
+
+class StatsError(ValueError):
+    """Parámetro de ``/api/stats`` inválido (se responde 400)."""
+
+
+def migrate_rollups(db):
+    db.executescript("""
+    CREATE TABLE IF NOT EXISTS events_rollup (
+        size INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        event_type TEXT NOT NULL,
+        intent TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (size, bucket, event_type, intent, channel)
+    ) WITHOUT ROWID;
+    -- Versión anterior de questions_rollup (sin kind ni question en events)
+    DROP TABLE IF EXISTS unanswered_rollup;
+    CREATE TABLE IF NOT EXISTS questions_rollup (
+        day INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        question TEXT NOT NULL,
+        sample TEXT,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, kind, channel, question)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    );
+    """)
+    db.commit()
+
+
+# -----------------------
+# Actualización incremental
+# -----------------------
+# Un solo recorrido de events por tramo: primero por minuto en una tabla
+# temporal y de ahí a cada granularidad.
+_CHUNK_SQL = """
+    INSERT INTO temp.rollup_chunk (bucket, event_type, intent, channel, count)
+    SELECT COALESCE(timestamp, 0) / 60000 * 60, event_type, COALESCE(intent, ''),
+           COALESCE(channel, ''), COUNT(*)
+    FROM events
+    WHERE id > ? AND id <= ?
+    GROUP BY 1, 2, 3, 4
+"""
+
+_ROLLUP_SQL = """
+    INSERT INTO events_rollup (size, bucket, event_type, intent, channel, count)
+    SELECT ?, bucket - bucket % ?, event_type, intent, channel, SUM(count)
+    FROM temp.rollup_chunk
+    WHERE bucket >= ?
+    GROUP BY 2, 3, 4, 5
+    ON CONFLICT (size, bucket, event_type, intent, channel)
+    DO UPDATE SET count = count + excluded.count
+"""
+
+_QUESTIONS_SQL = """
+    SELECT timestamp, COALESCE(channel, ''), event_type, intent, question
+    FROM events NOT INDEXED
+    WHERE id > ? AND id <= ? AND question IS NOT NULL
+      AND event_type IN ({answers}) AND intent IN ({intents})
+""".format(
+    answers=", ".join(f"'{e}'" for e in ANSWER_EVENTS),
+    intents=", ".join(f"'{i}'" for i in sorted(set(FALLBACK_INTENTS) | set(UNANSWERED_INTENTS))),
+)
+
+
+def _question_kinds(event_type, intent):
+    if event_type == "message_received" and intent in FALLBACK_INTENTS:
+        yield "sin_intent"
+    if intent in UNANSWERED_INTENTS:
+        yield "sin_respuesta"
+
+
+def watermark(db):
+    row = db.execute("SELECT last_id FROM rollup_state WHERE name = 'events'").fetchone()
+    return row[0] if row else 0
+
+
+def _rollup_questions(db, last, upper):
+    agg = {}
+    for ts, channel, event_type, intent, text in db.execute(_QUESTIONS_SQL, (last, upper)):
+        question = normalizar(text)
+        if not question:
+            continue
+        day = (ts or 0) // 1000 // 86400 * 86400
+        for kind in _question_kinds(event_type, intent):
+            key = (day, kind, channel, question)
+            count, _ = agg.get(key, (0, None))
+            agg[key] = (count + 1, text)
+    db.executemany("""
+        INSERT INTO questions_rollup (day, kind, channel, question, sample, count) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day, kind, channel, question)
+        DO UPDATE SET count = count + excluded.count, sample = excluded.sample
+    """, [(*key, sample, count) for key, (count, sample) in agg.items()])
+
+
+def refresh_rollups(db, chunk=DEFAULT_CHUNK, minute_cutoff=0, max_chunks=None):
+    """Agrega los eventos posteriores a la marca; devuelve la nueva marca.
+
+    ``minute_cutoff`` (epoch en segundos): los intervalos de minuto anteriores
+    no se generan y se borran. ``max_chunks`` limita el trabajo por llamada.
+    """
+    done = 0
+    while max_chunks is None or done < max_chunks:
+        # IMMEDIATE: nadie más escribe en events mientras se leen MAX(id) y la marca
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            last = watermark(db)
+            top = db.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+            if top <= last:
+                db.rollback()
+                return last
+            upper = min(top, last + chunk)
+            db.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS rollup_chunk
+                (bucket INTEGER, event_type TEXT, intent TEXT, channel TEXT, count INTEGER)
+            """)
+            db.execute("DELETE FROM temp.rollup_chunk")
+            db.execute(_CHUNK_SQL, (last, upper))
+            for size in GRANULARITIES.values():
+                db.execute(_ROLLUP_SQL, (size, size, minute_cutoff if size == 60 else 0))
+            _rollup_questions(db, last, upper)
+            if minute_cutoff:
+                db.execute("DELETE FROM events_rollup WHERE size = 60 AND bucket < ?", (minute_cutoff,))
+            db.execute("""
+                INSERT INTO rollup_state (name, last_id) VALUES ('events', ?)
+                ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id
+            """, (upper,))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        done += 1
+    return watermark(db)
+
+
+def reset_rollups(db):
+    db.execute("DELETE FROM events_rollup")
+    db.execute("DELETE FROM questions_rollup")
+    db.execute("DELETE FROM rollup_state")
+    db.commit()
+
+
+# -----------------------
+# Consultas
+# -----------------------
+def choose_granularity(desde, hasta, minute_cutoff=0):
+    span = hasta - desde if desde is not None else None
+    if span is not None and span <= 6 * 3600 and desde >= minute_cutoff:
+        return "minuto"
+    if span is not None and span <= 7 * 86400:
+        return "hora"
+    return "dia"
+
+
+def _rate(part, total):
+    return round(part / total, 4) if total else None
+
+
+def query_stats(db, desde=None, hasta=None, granularidad=None, event_type=None, channel=None,
+                top=10, minute_cutoff=0):
+    """Resumen de ``events`` en ``[desde, hasta]`` (epoch en segundos) desde los agregados."""
+    hasta = int(time.time()) if hasta is None else hasta
+    granularidad = granularidad or choose_granularity(desde, hasta, minute_cutoff)
+    if granularidad not in GRANULARITIES:
+        raise StatsError(f"granularidad inválida: {granularidad} (use {', '.join(GRANULARITIES)})")
+    size = GRANULARITIES[granularidad]
+    start = (desde // size * size) if desde is not None else 0
+    if desde is not None and (hasta - start) // size > MAX_BUCKETS:
+        raise StatsError(f"demasiados intervalos de {granularidad}; use una granularidad mayor")
+
+    where = "size = ? AND bucket >= ? AND bucket <= ?"
+    params = [size, start, hasta]
+    if event_type:
+        where += " AND event_type = ?"
+        params.append(event_type)
+    if channel:
+        where += " AND channel = ?"
+        params.append(channel)
+
+    por_tipo, por_intent, por_canal = {}, {}, {}
+    recibidos = respuestas = fallback = sin_respuesta = 0
+    for etype, intent, chan, count in db.execute(f"""
+        SELECT event_type, intent, channel, SUM(count) FROM events_rollup
+        WHERE {where} GROUP BY event_type, intent, channel
+    """, params):
+        por_tipo[etype] = por_tipo.get(etype, 0) + count
+        if intent:
+            por_intent[intent] = por_intent.get(intent, 0) + count
+        por_canal[chan] = por_canal.get(chan, 0) + count
+        if etype == "message_received":
+            recibidos += count
+            fallback += count if intent in FALLBACK_INTENTS else 0
+        if etype in ANSWER_EVENTS:
+            respuestas += count
+            sin_respuesta += count if intent in UNANSWERED_INTENTS else 0
+
+    serie = [
+        {"bucket": bucket, "event_type": etype, "count": count}
+        for bucket, etype, count in db.execute(f"""
+            SELECT bucket, event_type, SUM(count) FROM events_rollup
+            WHERE {where} GROUP BY bucket, event_type ORDER BY bucket, event_type
+        """, params)
+    ]
+
+    day_where = "day >= ? AND day <= ?"
+    day_params = [(desde or 0) // 86400 * 86400, hasta]
+    if channel:
+        day_where += " AND channel = ?"
+        day_params.append(channel)
+    preguntas = {
+        kind: [
+            {"pregunta": sample, "count": count}
+            for sample, count in db.execute(f"""
+                SELECT MAX(sample), SUM(count) AS total FROM questions_rollup
+                WHERE kind = ? AND {day_where} GROUP BY question ORDER BY total DESC, question LIMIT ?
+            """, (kind, *day_params, top))
+        ]
+        for kind in ("sin_intent", "sin_respuesta")
+    }
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "granularidad": granularidad,
+        "total": sum(por_tipo.values()),
+        "por_tipo": por_tipo,
+        "por_intent": por_intent,
+        "por_canal": por_canal,
+        "fallback_rate": _rate(fallback, recibidos),
+        "sin_respuesta_rate": _rate(sin_respuesta, respuestas),
+        "serie": serie,
+        **preguntas,
+        "marca": watermark(db),
+    }
+
+
+# -----------------------
+# Mantenimiento desde la app
+# -----------------------
+class Rollups:
+    """Mantiene los agregados de un ``storage.Database`` al día.
+
+    ``maybe_refresh`` se llama tras cada lote del escritor de eventos (un tramo
+    como mucho y como mucho una vez cada ``interval`` segundos, para no
+    frenarlo). ``query`` siempre completa la actualización antes de responder.
+    """
+
+    def __init__(self, database, interval=2.0, chunk=DEFAULT_CHUNK, minute_retention_days=7):
+        self.database = database
+        self.interval = interval
+        self.chunk = chunk
+        self.minute_retention_days = minute_retention_days
+        self.watermark = 0
+        self.refreshes = 0
+        self.errors = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def minute_cutoff(self):
+        if not self.minute_retention_days:
+            return 0
+        return int(time.time() - self.minute_retention_days * 86400) // 60 * 60
+
+    def refresh(self, wait=True, max_chunks=None):
+        if not self._lock.acquire(blocking=wait):
+            return self.watermark
+        try:
+            with self.database.connection() as db:
+                self.watermark = refresh_rollups(db, self.chunk, self.minute_cutoff(), max_chunks)
+            self.refreshes += 1
+            self._last_refresh = time.monotonic()
+        finally:
+            self._lock.release()
+        return self.watermark
+
+    def maybe_refresh(self, wait=False, max_chunks=1):
+        if time.monotonic() - self._last_refresh < self.interval:
+            return self.watermark
+        try:
+            return self.refresh(wait, max_chunks)
+        except Exception as e:
+            self.errors += 1
+            logging.error("No se pudieron actualizar los agregados de eventos: %s", e)
+            return self.watermark
+
+    def query(self, **kwargs):
+        self.refresh(wait=True)
+        with self.database.connection() as db:
+            return query_stats(db, minute_cutoff=self.minute_cutoff(), **kwargs)
+
+    def stats(self):
+        return {"watermark": self.watermark, "refreshes": self.refreshes, "errors": self.errors}
+
+
+def create_rollups_from_env(database):
+    return Rollups(
+        database,
+        interval=float(os.environ.get("ANALYTICS_INTERVAL", "2")),
+        minute_retention_days=float(os.environ.get("ANALYTICS_MINUTE_DAYS", "7")),
+    )
+
+
+if __name__ == "__main__":
+    from storage import Database, migrate_events
+
+    logging.basicConfig(level=logging.INFO)
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Actualiza los agregados de events")
+    parser.add_argument("accion", choices=["actualizar", "reconstruir"])
+    parser.add_argument("--db", default=os.path.join(here, "edubot.db"))
+    parser.add_argument("--minute-days", type=float, default=7, help="días con intervalos de minuto")
+    args = parser.parse_args()
+
+    rollups = Rollups(Database(args.db), minute_retention_days=args.minute_days)
+    with rollups.database.connection() as db:
+        migrate_events(db)
+        migrate_rollups(db)
+        if args.accion == "reconstruir":
+            reset_rollups(db)
+    start = time.perf_counter()
+    marca = rollups.refresh()
+    logging.info("Agregados al día hasta el evento %s (%.1f s)", marca, time.perf_counter() - start)
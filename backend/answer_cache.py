@@ -0,0 +1,255 @@
+# backend/answer_cache.py
+"""Caché de respuestas del modelo delante de ``ollama_intent``.
+
+- Clave: pregunta normalizada (minúsculas, sin tildes ni puntuación).
+- Opcionalmente, coincidencia aproximada por similitud de Jaccard entre las
+  palabras significativas de la pregunta (índice invertido, sin escanear todo).
+- Nivel en memoria con TTL y expulsión LRU acotado por ``max_entries``.
+- Nivel persistente opcional en SQLite que sobrevive a reinicios, acotado a
+  ``db_max_entries`` filas (las que caducan antes se borran primero).
+- Las entradas pertenecen a un ``namespace`` derivado del modelo y la plantilla
+  del prompt: si cualquiera cambia, las entradas anteriores dejan de valer.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from textnorm import normalizar, tokens
+
+
+# Cada cuántas escrituras se podan las filas caducadas o sobrantes del nivel persistente
+TRIM_EVERY = 100
+
+
+def cache_namespace(model, prompt_template):
+    return hashlib.sha1(f"{model}\n{prompt_template}".encode("utf-8")).hexdigest()[:12]
+
+
+class AnswerCache:
+    def __init__(self, namespace, max_entries=1000, ttl=3600, db_path=None, similarity=0.0,
+                 db_max_entries=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.db_max_entries = db_max_entries if db_max_entries is not None else max_entries * 10
+        self.ttl = ttl
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        # clave normalizada -> (respuesta, expira_en, tokens)
+        self._entries = OrderedDict()
+        self._index = {}
+        self.hits = 0
+        self.similar_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db_errors = 0
+        self._db = None
+        self._puts_since_trim = 0
+        if db_path:
+            self._open_db(db_path)
+
+    # -----------------------
+    # Nivel persistente
+    # -----------------------
+    def _open_db(self, db_path):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            namespace TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            respuesta TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, clave)
+        )
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answer_cache_expires ON answer_cache (namespace, expires_at)"
+        )
+        # Invalidación: lo guardado con otro modelo/plantilla ya no sirve.
+        cur = self._db.execute("DELETE FROM answer_cache WHERE namespace != ?", (self.namespace,))
+        removed = cur.rowcount + self._db_trim()
+        self._db.commit()
+        if removed:
+            logging.info("Caché de respuestas: %s entradas obsoletas eliminadas", removed)
+        # Precarga de las entradas más recientes en el nivel en memoria
+        rows = self._db.execute(
+            "SELECT clave, respuesta, expires_at FROM answer_cache ORDER BY expires_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for clave, respuesta, expires_at in reversed(rows):
+            self._store(clave, respuesta, expires_at)
+
+    def _db_get(self, clave):
+        try:
+            row = self._db.execute(
+                "SELECT respuesta, expires_at FROM answer_cache WHERE namespace = ? AND clave = ?",
+                (self.namespace, clave),
+            ).fetchone()
+        except sqlite3.Error as e:
+            # Sin el nivel persistente la pregunta va al modelo, como un fallo de caché
+            self.db_errors += 1
+            logging.warning("No se pudo leer la caché de respuestas persistente: %s", e)
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        return row
+
+    def _db_put(self, clave, respuesta, expires_at):
+        self._db.execute(
+            "INSERT OR REPLACE INTO answer_cache (namespace, clave, respuesta, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, clave, respuesta, expires_at),
+        )
+        self._puts_since_trim += 1
+        if self._puts_since_trim >= TRIM_EVERY:
+            self._db_trim()
+        self._db.commit()
+
+    def _db_trim(self):
+        """Borra las filas caducadas y las que pasen de ``db_max_entries``; devuelve cuántas."""
+        self._puts_since_trim = 0
+        removed = self._db.execute(
+            "DELETE FROM answer_cache WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time()),
+        ).rowcount
+        # expires_at = momento de la escritura + ttl: se conservan las más recientes
+        removed += self._db.execute("""
+            DELETE FROM answer_cache WHERE namespace = ? AND clave IN (
+                SELECT clave FROM answer_cache WHERE namespace = ?
+                ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.namespace, self.db_max_entries)).rowcount
+        return removed
+
+    # -----------------------
+    # Nivel en memoria
+    # -----------------------
+    def _store(self, clave, respuesta, expires_at):
+        if clave in self._entries:
+            self._drop(clave)
+        toks = frozenset(tokens(clave)) if self.similarity else frozenset()
+        self._entries[clave] = (respuesta, expires_at, toks)
+        for t in toks:
+            self._index.setdefault(t, set()).add(clave)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, clave):
+        _, _, toks = self._entries.pop(clave)
+        for t in toks:
+            claves = self._index.get(t)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._index[t]
+
+    def _lookup(self, clave, now):
+        entry = self._entries.get(clave)
+        if entry is None:
+            return None
+        if entry[1] < now:
+            self._drop(clave)
+            return None
+        self._entries.move_to_end(clave)
+        return entry[0]
+
+    def _lookup_similar(self, clave, now):
+        toks = tokens(clave)
+        if not toks:
+            return None
+        candidatos = set()
+        for t in toks:
+            candidatos |= self._index.get(t, set())
+        best, best_score = None, self.similarity
+        for cand in candidatos:
+            otros = self._entries[cand][2]
+            score = len(toks & otros) / len(toks | otros)
+            if score >= best_score:
+                best, best_score = cand, score
+        return self._lookup(best, now) if best is not None else None
+
+    # -----------------------
+    # API pública
+    # -----------------------
+    def get(self, pregunta):
+        clave = normalizar(pregunta)
+        if not clave:
+            return None
+        now = time.time()
+        with self._lock:
+            respuesta = self._lookup(clave, now)
+            if respuesta is not None:
+                self.hits += 1
+                return respuesta
+            if self._db is not None:
+                row = self._db_get(clave)
+                if row is not None:
+                    self._store(clave, row[0], row[1])
+                    self.persistent_hits += 1
+                    return row[0]
+            if self.similarity:
+                respuesta = self._lookup_similar(clave, now)
+                if respuesta is not None:
+                    self.similar_hits += 1
+                    return respuesta
+            self.misses += 1
+            return None
+
+    def put(self, pregunta, respuesta):
+        clave = normalizar(pregunta)
+        if not clave or not respuesta:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(clave, respuesta, expires_at)
+            if self._db is not None:
+                try:
+                    self._db_put(clave, respuesta, expires_at)
+                except sqlite3.Error as e:
+                    self.db_errors += 1
+                    logging.warning("No se pudo persistir la caché de respuestas: %s", e)
+                    try:
+                        self._db.rollback()
+                    except sqlite3.Error:
+                        pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answer_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "db_errors": self.db_errors,
+            }
+
+
+def create_cache_from_env(model, prompt_template):
+    """Construye la caché según variables de entorno; ``None`` si está desactivada."""
+    max_entries = int(os.environ.get("ANSWER_CACHE_SIZE", "1000"))
+    if max_entries <= 0:
+        return None
+    return AnswerCache(
+        cache_namespace(model, prompt_template),
+        max_entries=max_entries,
+        ttl=float(os.environ.get("ANSWER_CACHE_TTL", "3600")),
+        db_path=os.environ.get("ANSWER_CACHE_DB") or None,
+        similarity=float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0")),
+        db_max_entries=int(os.environ.get("ANSWER_CACHE_DB_SIZE", str(max_entries * 10))),
+    )
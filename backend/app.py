@@ -1,86 +1,103 @@
 # backend/app.py
-from flask import Flask, request, jsonify, g, send_from_directory, abort
+from flask import Flask, Response, request, jsonify, g, send_from_directory, abort, stream_with_context
 from flask_cors import CORS
-import sqlite3
 import time
 import os
-import subprocess
 import re
 import json
 import logging
+from contextlib import closing
+from urllib.parse import urlencode
+
+from analytics import StatsError, create_rollups_from_env, migrate_rollups
+from answer_cache import create_cache_from_env
+from bulk_import import (
+    DEFAULT_BATCH, INSERT_TRAMITE, TramiteError, import_tramites, read_records, text_lines,
+    tramite_values, validate_tramite,
+)
+from event_logger import create_writer_from_env
+from intent_matcher import IntentMatcher, IntentRouter
+from listing import ListingError, logs_query, parse_time, run_listing, tramites_query
+from llm_client import create_client_from_env, LLMBusy, LLMTimeout
+from metrics import REGISTRY, Tracer, timed
+from pdf_worker import create_renderer_from_env, render_tramite_pdf, tramite_job
+from storage import Database, has_fts, migrate_events, migrate_tramites
 
 # Configuración básica
 logging.basicConfig(level=logging.INFO)
-DB_PATH = os.path.join(os.path.dirname(__file__), "edubot.db")
-TRAMITES_DB_PATH = os.path.join(os.path.dirname(__file__), "tramites.db")
-PDF_DIR = os.path.join(os.path.dirname(__file__), "pdfs")
-os.makedirs(PDF_DIR, exist_ok=True)
+DB_PATH = os.environ.get("EDUBOT_DB") or os.path.join(os.path.dirname(__file__), "edubot.db")
+TRAMITES_DB_PATH = os.environ.get("TRAMITES_DB") or os.path.join(os.path.dirname(__file__), "tramites.db")
+PDF_DIR = os.environ.get("PDF_DIR") or os.path.join(os.path.dirname(__file__), "pdfs")
 
 app = Flask(__name__, static_folder=None)
 CORS(app)
 
 # -----------------------
-# Helpers SQLite
+# Métricas y trazas (ver metrics.py; se exponen en /metrics y /api/trazas)
 # -----------------------
-def get_db():
-    db = getattr(g, "_database", None)
-    if db is None:
-        db = g._database = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
-        db.row_factory = sqlite3.Row
-    return db
-
-def get_tramites_db():
-    db = sqlite3.connect(TRAMITES_DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
-    db.row_factory = sqlite3.Row
-    return db
+tracer = Tracer(sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "0")))
+HTTP_LATENCY = REGISTRY.histogram("edubot_http_request_seconds", "Latencia de las peticiones HTTP", ("endpoint", "method", "status"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("edubot_http_requests_in_flight", "Peticiones HTTP en curso", ("endpoint",))
+LLM_LATENCY = REGISTRY.histogram("edubot_llm_request_seconds", "Duración de las llamadas al modelo", ("mode", "outcome"))
+LLM_FIRST_TOKEN = REGISTRY.histogram("edubot_llm_first_token_seconds", "Tiempo hasta el primer token en streaming")
+LLM_TIMEOUTS = REGISTRY.counter("edubot_llm_timeouts_total", "Llamadas al modelo que agotaron su deadline", ("mode",))
+DB_LATENCY = REGISTRY.histogram("edubot_db_seconds", "Consultas y commits en SQLite", ("db", "op"))
+PDF_LATENCY = REGISTRY.histogram("edubot_pdf_render_seconds", "Generación de PDFs (en el pool, desde que se encola)", ("mode", "ok"))
+
+@app.before_request
+def metrics_before_request():
+    endpoint = request.url_rule.rule if request.url_rule else "sin_ruta"
+    g._metrics = (time.perf_counter(), endpoint)
+    HTTP_IN_FLIGHT.inc(endpoint=endpoint)
+    force = request.headers.get("X-Trace") == "1"
+    g._trace = tracer.begin(f"{request.method} {endpoint}", force=force)
+
+@app.after_request
+def metrics_after_request(response):
+    g._status = response.status_code
+    return response
+
+# En respuestas en streaming la latencia llega hasta que se devuelve la
+# respuesta; la generación se mide aparte (edubot_llm_*) y la traza la cierra
+# el propio stream (ver ollama_stream).
+@app.teardown_request
+def metrics_teardown_request(exception):
+    started = g.pop("_metrics", None)
+    if started is None:
+        return
+    start, endpoint = started
+    status = g.pop("_status", 500)
+    HTTP_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method, status=status)
+    HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+    try:
+        tracer.end(g.pop("_trace", None), status=status)
+    except ValueError:
+        pass
 
+# -----------------------
+# Helpers SQLite
+# -----------------------
 def init_db():
-    db = sqlite3.connect(DB_PATH)
-    cur = db.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        event_type TEXT NOT NULL,
-        intent TEXT,
-        text TEXT,
-        channel TEXT,
-        timestamp INTEGER
-    )
-    """)
-    db.commit()
-    db.close()
+    with events_db.connection() as db:
+        migrate_events(db)
+        migrate_rollups(db)
 
 def init_tramites_db():
-    db = sqlite3.connect(TRAMITES_DB_PATH)
-    cur = db.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS tramites (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        tipo TEXT,
-        nombre TEXT,
-        grado TEXT,
-        extra TEXT,
-        created_at INTEGER
-    )
-    """)
-    db.commit()
-    db.close()
+    global tramites_fts
+    with tramites_db.connection() as db:
+        migrate_tramites(db)
+        tramites_fts = has_fts(db)
 
-@app.teardown_appcontext
-def close_connection(exception):
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+tramites_fts = False
 
-def save_event(event_type, intent=None, text=None, channel="web"):
+def on_events_flushed(rows, seconds):
+    DB_LATENCY.observe(seconds, db="edubot", op="events_commit")
+    rollups.maybe_refresh()
+
+def save_event(event_type, intent=None, text=None, channel="web", question=None):
     try:
-        db = get_db()
-        cur = db.cursor()
-        cur.execute("""
-            INSERT INTO events (event_type, intent, text, channel, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        """, (event_type, intent, text, channel, int(time.time() * 1000)))
-        db.commit()
+        with tracer.span("save_event"):
+            event_writer.submit(event_type, intent, text, channel, question=question)
     except Exception as e:
         logging.exception("Error guardando evento: %s", e)
 
@@ -96,84 +113,221 @@ SAMPLE_RESPONSES = [
 ]
 
 def detect_intent(text):
-    t = (text or "").lower()
-    for s in SAMPLE_RESPONSES:
-        for k in s["keywords"]:
-            if k in t:
-                return s["intent"], s["reply"]
-    return "fallback", "Lo siento, no entendí."
+    matcher = intent_router.current()
+    with tracer.span("detect_intent"):
+        intent = matcher.best(text)
+    if intent is None:
+        return "fallback", "Lo siento, no entendí."
+    return intent, matcher.replies[intent]
+
+# Respuestas propias de /api/chat: gana la primera de la lista que coincida
+# ("horario de matrícula" → horario), como en la versión con if/elif
+CHAT_RESPONSES = [
+    {"intent": "horario", "keywords": ["horario"], "reply": "El horario escolar es de lunes a viernes de 7:00 am a 2:00 pm."},
+    {"intent": "matricula", "keywords": ["matrícula"], "reply": "Las matrículas estarán abiertas del 10 al 25 de enero."},
+]
+chat_matcher = IntentMatcher(CHAT_RESPONSES)
 
 # -----------------------
 # Ollama helper (robusto)
 # -----------------------
-def ollama_intent(texto):
-    prompt = f"""
+PROMPT_TEMPLATE = """
 Eres un asistente educativo amable, claro y directo.
 Responde de forma breve y precisa a la siguiente pregunta sin hacer preguntas de vuelta.
 Pregunta: {texto}
 Respuesta:
 """
 
+def llm_error_reply(exc):
+    if isinstance(exc, LLMTimeout):
+        return "Lo siento, el modelo tardó demasiado en responder."
+    if isinstance(exc, LLMBusy):
+        return "El asistente está atendiendo muchas consultas, intenta de nuevo en un momento."
+    logging.warning("Error en Ollama: %s", exc)
+    return "Hubo un problema con el servicio de IA."
+
+def cached_answer(texto):
+    if answer_cache is None:
+        return None
+    with tracer.span("answer_cache"):
+        return answer_cache.get(texto)
+
+def llm_outcome(exc):
+    if exc is None:
+        return "ok"
+    if isinstance(exc, LLMTimeout):
+        return "timeout"
+    if isinstance(exc, LLMBusy):
+        return "busy"
+    return "error"
+
+def observe_llm(mode, outcome, start):
+    LLM_LATENCY.observe(time.perf_counter() - start, mode=mode, outcome=outcome)
+    if outcome == "timeout":
+        LLM_TIMEOUTS.inc(mode=mode)
+
+def remember_answer(texto, respuesta):
+    if answer_cache is not None and respuesta:
+        answer_cache.put(texto, respuesta)
+
+def ollama_intent(texto):
+    cached = cached_answer(texto)
+    if cached is not None:
+        return "respuesta_directa", cached
+
+    prompt = PROMPT_TEMPLATE.format(texto=texto)
+
+    start = time.perf_counter()
     try:
-        result = subprocess.run(
-            ["ollama", "run", "llama3.2:1b", "--", prompt],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="ignore",
-            timeout=45,
-            env={**os.environ, "OLLAMA_OPTIONS": "{\"num_predict\": 100}"}
-        )
-
-        raw = result.stdout.strip()
+        with tracer.span("llm"):
+            raw = llm.generate(prompt).strip()
+        observe_llm("generate", "ok", start)
+        remember_answer(texto, raw)
         return "respuesta_directa", raw
+    except Exception as e:
+        observe_llm("generate", llm_outcome(e), start)
+        return "error", llm_error_reply(e)
 
-    except subprocess.TimeoutExpired:
-        return "error", "Lo siento, el modelo tardó demasiado en responder."
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    except Exception as e:
-        print("Error en Ollama:", e)
-        return "error", "Hubo un problema con el servicio de IA."
+def ollama_stream(texto, on_close):
+    """Eventos SSE con los tokens según se generan.
+
+    ``on_close(intent, respuesta)`` se llama siempre al cerrar el stream, también
+    si el cliente se desconecta (intent ``cancelado``); en ese caso el cierre del
+    generador interno corta la generación en el modelo.
+
+    El generador corre después de que termine la petición, así que su traza
+    (si la hay) queda abierta hasta que se cierra el stream.
+    """
+    return _ollama_stream(texto, on_close, tracer.hold())
+
+def _ollama_stream(texto, on_close, trace):
+    intent = "respuesta_directa"
+    try:
+        with tracer.attach(trace):
+            cached = cached_answer(texto)
+        if cached is not None:
+            with tracer.attach(trace):
+                on_close(intent, cached)
+            yield sse_event("token", {"token": cached})
+            yield sse_event("done", {"intent": intent, "respuesta": cached})
+            return
+
+        partes = []
+        respuesta = None
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            with closing(llm.stream(PROMPT_TEMPLATE.format(texto=texto))) as tokens:
+                for tok in tokens:
+                    if not partes:
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - start)
+                        tracer.record(trace, "llm.first_token", start)
+                    partes.append(tok)
+                    yield sse_event("token", {"token": tok})
+        except GeneratorExit:
+            intent, outcome = "cancelado", "cancelled"
+            raise
+        except Exception as e:
+            intent, respuesta = "error", llm_error_reply(e)
+            outcome = llm_outcome(e)
+        finally:
+            observe_llm("stream", outcome, start)
+            tracer.record(trace, "llm", start)
+            if respuesta is None:
+                respuesta = "".join(partes).strip()
+                if intent == "respuesta_directa":
+                    remember_answer(texto, respuesta)
+            with tracer.attach(trace):
+                on_close(intent, respuesta)
+        yield sse_event("done", {"intent": intent, "respuesta": respuesta})
+    finally:
+        tracer.release(trace, intent=intent)
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # -----------------------
-# PDF generator (simple)
+# PDF generator (pool de procesos, ver pdf_worker.py)
 # -----------------------
+PDF_WAIT_SECONDS = float(os.environ.get("PDF_WAIT_SECONDS", "15"))
+
 def generate_tramite_pdf(tramite_id, tipo, data):
-    pdf_path = os.path.join(PDF_DIR, f"tramite_{tramite_id}.pdf")
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        c = canvas.Canvas(pdf_path, pagesize=A4)
-        width, height = A4
-
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(40, height - 60, "Gestor de Trámites - Institución Educativa")
-        c.setFont("Helvetica", 10)
-        c.drawString(40, height - 80, f"Trámite: {tipo}")
-        c.drawString(40, height - 95, f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        c.line(40, height - 100, width - 40, height - 100)
-
-        y = height - 130
-        c.setFont("Helvetica", 11)
-        for k, v in (data or {}).items():
-            c.drawString(50, y, f"{k}: {v}")
-            y -= 18
-            if y < 60:
-                c.showPage()
-                y = height - 60
-
-        c.showPage()
-        c.save()
-        return pdf_path
-    except Exception as e:
-        logging.warning("No se pudo generar PDF con reportlab: %s. Guardando fallback.", e)
-        with open(pdf_path, "w", encoding="utf-8") as f:
-            f.write("Gestor de Trámites - Documento (fallback)\n\n")
-            f.write(f"Trámite: {tipo}\n")
-            f.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            for k, v in (data or {}).items():
-                f.write(f"{k}: {v}\n")
-        return pdf_path
+    """Versión síncrona: genera el PDF en este proceso y devuelve su ruta."""
+    with timed(PDF_LATENCY, tracer, "pdf_render", mode="sync", ok="true"):
+        return render_tramite_pdf(PDF_DIR, tramite_id, tipo, data)
+
+# Estado de los demás componentes, leído en cada scrape de /metrics
+REGISTRY.callback("edubot_event_queue_depth", "Eventos pendientes de escribir",
+                  lambda: [({}, event_writer.stats()["queue_depth"])])
+REGISTRY.callback("edubot_events_written_total", "Eventos escritos en edubot.db",
+                  lambda: [({}, event_writer.stats()["written"])], kind="counter")
+REGISTRY.callback("edubot_events_dropped_total", "Eventos descartados con la cola llena",
+                  lambda: [({}, event_writer.stats()["dropped"])], kind="counter")
+REGISTRY.callback("edubot_llm_in_flight", "Generaciones en curso / en cola", lambda: [
+    ({"state": "running"}, llm.limiter.in_flight), ({"state": "waiting"}, llm.limiter.waiting),
+], labelnames=("state",))
+REGISTRY.callback("edubot_llm_rejected_total", "Peticiones rechazadas por cola llena",
+                  lambda: [({}, llm.limiter.rejected)], kind="counter")
+REGISTRY.callback("edubot_answer_cache_total", "Consultas a la caché de respuestas", lambda: [
+    ({"result": k}, v) for k, v in answer_cache.stats().items()
+    if k in ("hits", "similar_hits", "persistent_hits", "misses")
+] if answer_cache is not None else [], kind="counter", labelnames=("result",))
+REGISTRY.callback("edubot_pdf_jobs_pending", "PDFs en cola o generándose",
+                  lambda: [({}, pdf_renderer.pending())])
+REGISTRY.callback("edubot_rollup_watermark", "Último id de events incluido en /api/stats",
+                  lambda: [({}, rollups.watermark)])
+REGISTRY.callback("edubot_db_connections_idle", "Conexiones SQLite libres en cada pool", lambda: [
+    ({"db": st["path"]}, st["idle"]) for st in (events_db.stats(), tramites_db.stats())
+], labelnames=("db",))
+
+# -----------------------
+# Servicios del proceso
+# -----------------------
+def init_services():
+    """Crea los servicios con estado (hilos, pools, ficheros) y migra las bases."""
+    global event_writer, events_db, tramites_db, rollups, intent_router, llm, answer_cache, pdf_renderer
+    os.makedirs(PDF_DIR, exist_ok=True)
+
+    # Los eventos se encolan y un hilo los escribe por lotes (ver event_logger.py);
+    # el hilo arranca con el primer evento.
+    event_writer = create_writer_from_env(DB_PATH)
+    event_writer.on_flush = on_events_flushed
+
+    # Pools de conexiones ya configuradas (PRAGMAs y sentencias preparadas, ver storage.py)
+    events_db = Database(DB_PATH, wal=event_writer.wal)
+    tramites_db = Database(TRAMITES_DB_PATH)
+    # Agregados de events para /api/stats (ver analytics.py)
+    rollups = create_rollups_from_env(events_db)
+    # Las migraciones van al importar: con `flask run` o gunicorn no se ejecuta el
+    # bloque __main__ y faltarían columnas nuevas (documento, question...).
+    init_db()
+    init_tramites_db()
+
+    # Autómata compilado una vez; INTENTS_FILE (.json o .db) permite ampliarlo y se
+    # recarga en caliente cuando cambia el fichero.
+    intent_router = IntentRouter(SAMPLE_RESPONSES, source=os.environ.get("INTENTS_FILE") or None)
+
+    # Cliente de larga vida: pool de conexiones + concurrencia acotada (ver llm_client.py)
+    llm = create_client_from_env()
+    # Caché de respuestas por pregunta normalizada; se invalida si cambia modelo o plantilla
+    answer_cache = create_cache_from_env(llm.model, PROMPT_TEMPLATE)
+
+    pdf_renderer = create_renderer_from_env(PDF_DIR)
+    pdf_renderer.on_done = lambda seconds, ok: PDF_LATENCY.observe(seconds, mode="pool", ok=str(ok).lower())
+
+# Los procesos del pool de PDFs (forkserver/spawn) vuelven a importar el módulo
+# principal como __mp_main__: con `python app.py` eso sería este fichero, y cada
+# proceso abriría sus propias bases, cliente LLM y caché (que además purga
+# ANSWER_CACHE_DB). Ahí solo hacen falta las definiciones.
+if __name__ != "__mp_main__":
+    init_services()
 
 # -----------------------
 # Endpoints
@@ -183,10 +337,9 @@ def generate_tramite_pdf(tramite_id, tipo, data):
 def api_chat():
     payload = request.get_json() or {}
     pregunta = payload.get("pregunta", "")
-    if "horario" in pregunta.lower():
-        respuesta = "El horario escolar es de lunes a viernes de 7:00 am a 2:00 pm."
-    elif "matrícula" in pregunta.lower() or "matricula" in pregunta.lower():
-        respuesta = "Las matrículas estarán abiertas del 10 al 25 de enero."
+    intent = chat_matcher.first(pregunta)
+    if intent is not None:
+        respuesta = chat_matcher.replies[intent]
     else:
         respuesta = "Lo siento, no tengo esa información. Consulta administración."
     return jsonify({"respuesta": respuesta})
@@ -196,98 +349,272 @@ def api_message():
     payload = request.get_json(force=True) or {}
     text = payload.get("text", "")
     channel = payload.get("channel", "web")
+    if not isinstance(text, str):
+        return jsonify({"error": "text debe ser texto"}), 400
 
     save_event("message_sent", text=text, channel=channel)
 
-    intent, reply = ollama_intent(text)
-    if intent == "desconocido" and reply.strip() == "":
-        intent, reply = detect_intent(text)
+    # Primer nivel: intents conocidos sin pasar por el modelo
+    intent, reply = detect_intent(text)
+    if intent == "fallback":
+        intent, reply = ollama_intent(text)
 
-    save_event("message_received", intent=intent, text=reply, channel=channel)
+    save_event("message_received", intent=intent, text=reply, channel=channel, question=text)
 
     return jsonify({"reply": reply, "intent": intent})
 
+@app.route("/api/message/stream", methods=["POST"])
+def api_message_stream():
+    payload = request.get_json(force=True) or {}
+    text = payload.get("text", "")
+    channel = payload.get("channel", "web")
+    if not isinstance(text, str):
+        return jsonify({"error": "text debe ser texto"}), 400
+
+    save_event("message_sent", text=text, channel=channel)
+
+    intent, reply = detect_intent(text)
+    if intent != "fallback":
+        save_event("message_received", intent=intent, text=reply, channel=channel, question=text)
+        return sse_response(iter([
+            sse_event("token", {"token": reply}),
+            sse_event("done", {"intent": intent, "respuesta": reply}),
+        ]))
+
+    def on_close(intent, reply):
+        save_event("message_received", intent=intent, text=reply, channel=channel, question=text)
+
+    return sse_response(ollama_stream(text, on_close))
+
 # ✅ NUEVO: Usa tramites.db en lugar de edubot.db
 @app.route("/api/tramite", methods=["POST"])
 def api_tramite():
     payload = request.get_json(force=True) or {}
-    tipo = payload.get("tipo")
-    nombre = payload.get("nombre")
-    grado = payload.get("grado")
-    extra = payload.copy()
-    for k in ("tipo", "nombre", "grado"):
-        extra.pop(k, None)
-
-    if not tipo or not nombre or not grado:
-        return jsonify({"ok": False, "error": "Faltan campos: tipo, nombre o grado"}), 400
+    try:
+        tipo, nombre, grado, extra = validate_tramite(payload)
+    except TramiteError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
     try:
-        db = get_tramites_db()
-        cur = db.cursor()
-        cur.execute("""
-            INSERT INTO tramites (tipo, nombre, grado, extra, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (tipo, nombre, grado, json.dumps(extra), int(time.time())))
-        tramite_id = cur.lastrowid
-        db.commit()
-        db.close()
+        with tramites_db.connection() as db, timed(DB_LATENCY, tracer, "db.insert_tramite", db="tramites", op="insert_tramite"):
+            cur = db.execute(INSERT_TRAMITE, tramite_values(tipo, nombre, grado, extra, time.time()))
+            tramite_id = cur.lastrowid
+            db.commit()
 
         save_event("tramite_submitted", intent=tipo, text=f"{tipo}-{nombre}-{grado}")
 
-        pdf_path = generate_tramite_pdf(tramite_id, tipo, {"nombre": nombre, "grado": grado, **extra})
+        # El trámite ya está guardado: si no se puede encolar el PDF se genera al descargarlo
+        try:
+            with tracer.span("pdf_submit"):
+                estado = pdf_renderer.submit(tramite_id, tipo, {"nombre": nombre, "grado": grado, **extra})
+        except Exception as e:
+            logging.error("No se pudo encolar el PDF del trámite %s: %s", tramite_id, e)
+            estado = "diferido"
 
-        logging.info("Trámite %s guardado en tramites.db. PDF: %s", tramite_id, pdf_path)
-        return jsonify({"ok": True, "id": tramite_id, "pdf": os.path.basename(pdf_path)})
+        logging.info("Trámite %s guardado en tramites.db. PDF: %s", tramite_id, estado)
+        return jsonify({"ok": True, "id": tramite_id, "pdf": f"tramite_{tramite_id}.pdf", "estado": estado})
     except Exception as e:
         logging.exception("Error registrando trámite: %s", e)
         return jsonify({"ok": False, "error": "Error interno al registrar trámite"}), 500
 
+IMPORT_MAX_BATCH = 10000
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+# Cuerpo CSV / JSON-lines o multipart con el campo "archivo".
+# ?pdfs=diferido (por defecto): cada PDF se genera al descargarlo por primera vez;
+# ?pdfs=ahora: se encolan todos en el pool de PDFs.
+@app.route("/api/tramites/importar", methods=["POST"])
+def api_importar_tramites():
+    formato = request.args.get("formato")
+    lote = max(1, min(request.args.get("lote", type=int, default=DEFAULT_BATCH), IMPORT_MAX_BATCH))
+    pdfs = request.args.get("pdfs", "diferido")
+    if pdfs not in ("diferido", "ahora"):
+        return jsonify({"ok": False, "error": "pdfs debe ser 'diferido' o 'ahora'"}), 400
+
+    upload = request.files.get("archivo")
+    if upload is not None:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        formato = formato or {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(ext)
+        source = text_lines(upload.stream)
+    else:
+        formato = formato or IMPORT_FORMATS.get(request.mimetype)
+        source = text_lines(request.stream)
+
+    def on_batch(jobs, seconds):
+        DB_LATENCY.observe(seconds, db="tramites", op="import_batch")
+        if pdfs == "ahora":
+            try:
+                for job in jobs:
+                    pdf_renderer.submit(*job)
+            except Exception as e:
+                # Las filas ya están confirmadas; los PDFs que falten se generan al descargarlos
+                logging.error("No se pudieron encolar los PDFs del lote: %s", e)
+
+    try:
+        with tramites_db.connection() as db, tracer.span("db.import_tramites"):
+            result = import_tramites(db, read_records(source, formato), lote, on_batch=on_batch)
+    except TramiteError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        logging.exception("Error importando trámites: %s", e)
+        return jsonify({"ok": False, "error": "Error interno al importar trámites"}), 500
+
+    save_event("tramites_imported", text=f"{result.inserted} filas, {result.error_count} errores")
+    logging.info("Importación: %s trámites, %s errores", result.inserted, result.error_count)
+    return jsonify({**result.to_dict(), "pdfs": pdfs}), 400 if result.fatal else 200
+
+def listing_response(database, sql, params, limit, sort_key, op):
+    db_label = "tramites" if database is tramites_db else "edubot"
+    with timed(DB_LATENCY, tracer, f"db.{op}", db=db_label, op=op):
+        body, next_cursor, close = run_listing(database, sql, params, limit, sort_key)
+    resp = Response(body, mimetype="application/json")
+    resp.call_on_close(close)
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resp
+
 # ✅ NUEVO: Usa tramites.db
+# Filtros: tipo, grado, desde, hasta, q (texto); paginación: limit + cursor
 @app.route("/api/tramites", methods=["GET"])
 def api_list_tramites():
     try:
-        db = get_tramites_db()
-        cur = db.cursor()
-        cur.execute("SELECT id, tipo, nombre, grado, extra, created_at FROM tramites ORDER BY created_at DESC")
-        rows = [dict(r) for r in cur.fetchall()]
-        db.close()
-        return jsonify(rows)
+        sql, params, limit = tramites_query(request.args, fts_available=tramites_fts)
+        return listing_response(tramites_db, sql, params, limit, "created_at", "list_tramites")
+    except ListingError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.exception("Error listando trámites: %s", e)
         return jsonify([]), 500
 
+# Filtros: event_type, intent, channel, desde, hasta; paginación: limit (máx. 1000) + cursor
 @app.route("/api/logs", methods=["GET"])
 def api_logs():
     try:
-        db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT id, event_type, intent, text, channel, timestamp FROM events ORDER BY timestamp DESC LIMIT 1000")
-        rows = [dict(r) for r in cur.fetchall()]
-        return jsonify(rows)
+        sql, params, limit = logs_query(request.args)
+        return listing_response(events_db, sql, params, limit, "timestamp", "list_logs")
+    except ListingError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.exception("Error obteniendo logs: %s", e)
         return jsonify([]), 500
 
+# Resumen de events desde los agregados: ?desde=&hasta=&granularidad=minuto|hora|dia
+# &event_type=&channel=&top=
+@app.route("/api/stats", methods=["GET"])
+def api_stats():
+    try:
+        top = max(1, min(request.args.get("top", type=int, default=10), 100))
+        with tracer.span("db.stats"):
+            stats = rollups.query(
+                desde=parse_time(request.args.get("desde")),
+                hasta=parse_time(request.args.get("hasta"), end_of_day=True),
+                granularidad=request.args.get("granularidad") or None,
+                event_type=request.args.get("event_type") or None,
+                channel=request.args.get("channel") or None,
+                top=top,
+            )
+        return jsonify(stats)
+    except (ListingError, StatsError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.exception("Error calculando estadísticas: %s", e)
+        return jsonify({"error": "Error interno al calcular estadísticas"}), 500
+
 @app.route("/api/ollama-chat", methods=["POST"])
 def api_ollama_chat():
     payload = request.get_json(force=True) or {}
     pregunta = payload.get("pregunta", "")
+    if not isinstance(pregunta, str):
+        return jsonify({"error": "pregunta debe ser texto"}), 400
     if not pregunta:
         return jsonify({"error": "Falta pregunta"}), 400
 
     intent, respuesta = ollama_intent(pregunta)
     save_event("ollama_question", text=pregunta)
-    save_event("ollama_answer", text=respuesta)
+    save_event("ollama_answer", intent=intent, text=respuesta, question=pregunta)
     return jsonify({"pregunta": pregunta, "respuesta": respuesta, "intent": intent})
 
+@app.route("/api/ollama-chat/stream", methods=["POST"])
+def api_ollama_chat_stream():
+    payload = request.get_json(force=True) or {}
+    pregunta = payload.get("pregunta", "")
+    if not isinstance(pregunta, str):
+        return jsonify({"error": "pregunta debe ser texto"}), 400
+    if not pregunta:
+        return jsonify({"error": "Falta pregunta"}), 400
+
+    save_event("ollama_question", text=pregunta)
+
+    def on_close(intent, respuesta):
+        save_event("ollama_answer", intent=intent, text=respuesta, question=pregunta)
+
+    return sse_response(ollama_stream(pregunta, on_close))
+
+@app.route("/api/intents/classify", methods=["POST"])
+def api_classify_intents():
+    payload = request.get_json(force=True) or {}
+    texts = payload.get("texts")
+    if not isinstance(texts, list):
+        return jsonify({"error": "Falta texts (lista)"}), 400
+    results = intent_router.current().match_many(str(t) for t in texts)
+    return jsonify([
+        [{"intent": intent, "score": score} for intent, score in matches]
+        for matches in results
+    ])
+
+@app.route("/api/intents/reload", methods=["POST"])
+def api_reload_intents():
+    matcher = intent_router.reload()
+    if intent_router.last_error:
+        return jsonify({"ok": False, "error": intent_router.last_error, "intents": len(matcher.replies)}), 500
+    return jsonify({"ok": True, "intents": len(matcher.replies)})
+
+@app.route("/api/tramite/<int:tramite_id>/estado", methods=["GET"])
+def estado_pdf(tramite_id):
+    return jsonify({"id": tramite_id, "estado": pdf_renderer.status(tramite_id)})
+
+def submit_missing_pdf(tramite_id):
+    """Encola el PDF de un trámite que no lo tiene (importado con pdfs=diferido,
+    estado ``diferido`` o un intento anterior fallido)."""
+    with tramites_db.connection() as db:
+        job = tramite_job(db, tramite_id)
+    if job is None:
+        return False
+    pdf_renderer.submit(*job)
+    return True
+
+# Si el PDF aún se está generando espera hasta ?espera= segundos (por defecto PDF_WAIT_SECONDS)
 @app.route("/api/descargar-pdf/<int:tramite_id>", methods=["GET"])
 def descargar_pdf(tramite_id):
     pdf_filename = f"tramite_{tramite_id}.pdf"
-    pdf_path = os.path.join(PDF_DIR, pdf_filename)
-    if not os.path.exists(pdf_path):
-        return jsonify({"error": "PDF no encontrado"}), 404
+    espera = request.args.get("espera", type=float, default=PDF_WAIT_SECONDS)
+    timeout = max(0.0, min(espera, 60.0))
+    estado = pdf_renderer.wait(tramite_id, timeout=timeout)
+    if estado in ("desconocido", "error") and submit_missing_pdf(tramite_id):
+        estado = pdf_renderer.wait(tramite_id, timeout=timeout)
+    if estado == "pendiente":
+        return jsonify({"id": tramite_id, "estado": estado}), 202
+    if estado != "listo":
+        return jsonify({"error": "PDF no encontrado", "estado": estado}), 404
     return send_from_directory(PDF_DIR, pdf_filename, as_attachment=True)
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/trazas", methods=["GET"])
+def api_trazas():
+    limit = request.args.get("limit", type=int, default=50)
+    return jsonify({"sample_rate": tracer.sample_rate, "trazas": tracer.recent(limit)})
+
 # -----------------------
 # Servir frontend estático (opcional)
 # -----------------------
@@ -314,7 +641,5 @@ def serve_frontend_file(filename):
 # MAIN
 # -----------------------
 if __name__ == "__main__":
-    init_db()
-    init_tramites_db()
     logging.info("Iniciando EduBot backend en http://127.0.0.1:5000 ")
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,13 @@
+# backend/bench/__init__.py
+"""Benchmarks del backend.
+
+Desde ``backend/``:
+
+    python -m bench seed  --tramites 100000 --events 1000000 --data-dir /tmp/edubot-bench
+    python -m bench load  --requests 500 --concurrency 16 --json load.json
+    python -m bench load  --url http://127.0.0.1:5000 --endpoints message,tramites
+    python -m bench micro --json micro.json
+
+Por defecto todo se ejecuta contra bases de datos temporales y un modelo falso
+determinista (``fake_llm_server``), sin tocar ``edubot.db`` ni ``tramites.db``.
+"""
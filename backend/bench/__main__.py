@@ -0,0 +1,90 @@
+# backend/bench/__main__.py
+"""Punto de entrada: ``python -m bench {load,micro,seed} ...`` desde ``backend/``."""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from bench.common import print_table, write_json
+from bench.load import ENDPOINTS, run_load
+from bench.micro import MICRO, run_micro
+from bench.seed import seed_events, seed_tramites
+
+
+def _list(value):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks de EduBot")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("load", help="prueba de carga de endpoints")
+    p.add_argument("--endpoints", type=_list, default=ENDPOINTS)
+    p.add_argument("--requests", type=int, default=200, help="peticiones por endpoint")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--url", help="servidor ya arrancado (si no, en proceso)")
+    p.add_argument("--data-dir", help="carpeta de datos (por defecto, temporal)")
+    p.add_argument("--token-delay", type=float, default=0.0, help="retardo por token del modelo falso")
+    p.add_argument("--no-cache", action="store_true", help="desactiva la caché de respuestas")
+    p.add_argument("--seed-tramites", type=int, default=0, help="filas previas en tramites.db")
+    p.add_argument("--seed-events", type=int, default=0, help="filas previas en edubot.db")
+    p.add_argument("--json", help="guardar resultados en este fichero")
+
+    p = sub.add_parser("micro", help="micro-benchmarks")
+    p.add_argument("--only", type=_list, default=list(MICRO))
+    p.add_argument("--iterations", type=int, default=10000)
+    p.add_argument("--data-dir")
+    p.add_argument("--json")
+
+    p = sub.add_parser("seed", help="rellena bases de datos con datos sintéticos")
+    p.add_argument("--data-dir", help="carpeta para las bases (por defecto, temporal)")
+    p.add_argument("--tramites-db", help="por defecto, <data-dir>/tramites.db")
+    p.add_argument("--events-db", help="por defecto, <data-dir>/edubot.db")
+    p.add_argument("--tramites", type=int, default=100000)
+    p.add_argument("--events", type=int, default=1000000)
+    p.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.cmd == "load":
+        unknown = set(args.endpoints) - set(ENDPOINTS)
+        if unknown:
+            parser.error(f"endpoints desconocidos: {', '.join(sorted(unknown))}")
+        results, context = run_load(
+            args.endpoints, args.requests, args.concurrency, url=args.url, data_dir=args.data_dir,
+            token_delay=args.token_delay, no_cache=args.no_cache,
+            tramites=args.seed_tramites, events=args.seed_events,
+        )
+        print_table(results)
+        if args.json:
+            config = {k: v for k, v in vars(args).items() if k not in ("cmd", "json")}
+            write_json(args.json, "load", config, results + ([{"name": "context", **context}] if context else []))
+    elif args.cmd == "micro":
+        unknown = set(args.only) - set(MICRO)
+        if unknown:
+            parser.error(f"micro-benchmarks desconocidos: {', '.join(sorted(unknown))}")
+        results = run_micro(args.only, args.iterations, data_dir=args.data_dir)
+        print_table(results)
+        if args.json:
+            write_json(args.json, "micro", {"iterations": args.iterations, "only": args.only}, results)
+    else:
+        # Nunca por defecto en el directorio actual: desde backend/ pisaría las bases reales.
+        if not (args.tramites_db and args.events_db):
+            data_dir = args.data_dir or tempfile.mkdtemp(prefix="edubot-bench-")
+            os.makedirs(data_dir, exist_ok=True)
+            args.tramites_db = args.tramites_db or os.path.join(data_dir, "tramites.db")
+            args.events_db = args.events_db or os.path.join(data_dir, "edubot.db")
+        for label, fn, path, n in (("tramites", seed_tramites, args.tramites_db, args.tramites),
+                                   ("events", seed_events, args.events_db, args.events)):
+            if n <= 0:
+                continue
+            start = time.perf_counter()
+            count = fn(path, n, seed=args.seed)
+            print(f"{label}: {count} filas en {path} ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
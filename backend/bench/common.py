@@ -0,0 +1,71 @@
+# backend/bench/common.py
+"""Utilidades comunes: percentiles, resumen y salida JSON."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+def percentile(sorted_values, p):
+    """Percentil ``p`` (0–100) por interpolación lineal sobre valores ordenados."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(name, latencies, elapsed, errors=0, extra=None):
+    """Resumen de una serie de latencias en segundos."""
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    result = {
+        "name": name,
+        "count": len(lat),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(lat) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": ms(sum(lat) / len(lat)) if lat else 0.0,
+        "p50_ms": ms(percentile(lat, 50)),
+        "p95_ms": ms(percentile(lat, 95)),
+        "p99_ms": ms(percentile(lat, 99)),
+        "max_ms": ms(lat[-1]) if lat else 0.0,
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(__file__), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": int(time.time()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def print_table(results):
+    cols = ["name", "count", "errors", "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    widths = [max(len(c), *(len(str(r.get(c, ""))) for r in results)) for c in cols]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    for r in results:
+        print("  ".join(str(r.get(c, "")).ljust(w) for c, w in zip(cols, widths)))
+
+
+def write_json(path, kind, config, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "meta": metadata(), "config": config, "results": results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {path}")
@@ -0,0 +1,199 @@
+# backend/bench/load.py
+"""Prueba de carga de los endpoints reales.
+
+Dos modos:
+
+- en proceso (por defecto): importa ``app`` con bases de datos temporales y el
+  modelo falso, y usa un ``test_client`` de Flask por hilo;
+- contra un servidor ya arrancado (``--url``), con una conexión keep-alive por
+  hilo. En ese caso el servidor debe apuntar a un modelo falso
+  (``python fake_llm_server.py`` + ``OLLAMA_URL``) para que sea determinista.
+"""
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from bench.common import summarize
+from bench.seed import GRADOS, NOMBRES, PREGUNTAS, TIPOS, seed_events, seed_tramites
+
+ENDPOINTS = ["message", "chat", "tramite", "tramites", "logs", "descargar-pdf"]
+
+# Preguntas que no reconoce el detector de intents: siempre llegan al modelo
+PREGUNTAS_LLM = [
+    "¿Qué libros recomiendan para vacaciones?",
+    "¿Cómo puedo mejorar en matemáticas?",
+    "¿Qué actividades hay en el recreo?",
+    "¿Quién es el coordinador académico?",
+]
+
+
+# -----------------------
+# Preparación en proceso
+# -----------------------
+def setup_inprocess(data_dir=None, token_delay=0.0, no_cache=False, tramites=0, events=0):
+    """Importa ``app`` apuntando a datos temporales y a un modelo falso."""
+    from fake_llm_server import start_fake_server
+
+    data_dir = data_dir or tempfile.mkdtemp(prefix="edubot-bench-")
+    server = start_fake_server(token_delay=token_delay)
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["EDUBOT_DB"] = os.path.join(data_dir, "edubot.db")
+    os.environ["TRAMITES_DB"] = os.path.join(data_dir, "tramites.db")
+    os.environ["PDF_DIR"] = os.path.join(data_dir, "pdfs")
+    if no_cache:
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+    if tramites:
+        seed_tramites(os.environ["TRAMITES_DB"], tramites)
+    if events:
+        seed_events(os.environ["EDUBOT_DB"], events)
+
+    import app as app_module
+    app_module.init_db()
+    app_module.init_tramites_db()
+    return app_module
+
+
+# -----------------------
+# Clientes
+# -----------------------
+class InProcessClient:
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, body=None):
+        resp = self.client.open(path, method=method, json=body)
+        data = resp.get_data()
+        resp.close()
+        return resp.status_code, data
+
+
+class HTTPClient:
+    def __init__(self, base_url):
+        parsed = urlparse(base_url)
+        self.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+
+    def request(self, method, path, body=None):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                resp = self.conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.conn.close()
+                if attempt:
+                    raise
+
+
+# -----------------------
+# Peticiones por endpoint
+# -----------------------
+def make_request(endpoint, rnd, pdf_ids):
+    if endpoint == "message":
+        texto = rnd.choice(PREGUNTAS + PREGUNTAS_LLM)
+        return "POST", "/api/message", {"text": f"{texto} #{rnd.randint(0, 10**6)}"}
+    if endpoint == "chat":
+        return "POST", "/api/chat", {"pregunta": rnd.choice(PREGUNTAS)}
+    if endpoint == "tramite":
+        return "POST", "/api/tramite", {
+            "tipo": rnd.choice(TIPOS),
+            "nombre": rnd.choice(NOMBRES),
+            "grado": rnd.choice(GRADOS),
+            "documento": str(rnd.randint(10**9, 2 * 10**9)),
+        }
+    if endpoint == "tramites":
+        return "GET", f"/api/tramites?limit=50&tipo={rnd.choice(TIPOS)}", None
+    if endpoint == "logs":
+        return "GET", "/api/logs?limit=100", None
+    if endpoint == "descargar-pdf":
+        return "GET", f"/api/descargar-pdf/{rnd.choice(pdf_ids)}", None
+    raise ValueError(f"endpoint desconocido: {endpoint}")
+
+
+def prepare_pdfs(client, count=20, seed=7):
+    """Crea trámites para tener PDFs que descargar y espera a que estén listos."""
+    rnd = random.Random(seed)
+    ids = []
+    for _ in range(count):
+        status, data = client.request(*make_request("tramite", rnd, ids))
+        if status == 200:
+            ids.append(json.loads(data)["id"])
+    for tid in ids:
+        client.request("GET", f"/api/descargar-pdf/{tid}?espera=30")
+    return ids
+
+
+def run_endpoint(endpoint, client_factory, requests, concurrency, seed=1, pdf_ids=None):
+    """Lanza ``requests`` peticiones repartidas entre ``concurrency`` hilos."""
+    latencies = []
+    statuses = {}
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(idx):
+        rnd = random.Random(seed * 1000 + idx)
+        client = client_factory()
+        local = []
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            method, path, body = make_request(endpoint, rnd, pdf_ids or [1])
+            start = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body)
+            except Exception:
+                status = 599
+            local.append(time.perf_counter() - start)
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status >= 400:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return summarize(endpoint, latencies, elapsed, errors[0], {
+        "concurrency": concurrency,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    })
+
+
+def run_load(endpoints, requests, concurrency, url=None, data_dir=None, token_delay=0.0,
+             no_cache=False, tramites=0, events=0):
+    if url:
+        client_factory = lambda: HTTPClient(url)
+        app_module = None
+    else:
+        app_module = setup_inprocess(data_dir, token_delay, no_cache, tramites, events)
+        client_factory = lambda: InProcessClient(app_module.app)
+
+    pdf_ids = prepare_pdfs(client_factory()) if "descargar-pdf" in endpoints else None
+    results = []
+    for endpoint in endpoints:
+        results.append(run_endpoint(endpoint, client_factory, requests, concurrency, pdf_ids=pdf_ids))
+    if app_module is not None:
+        app_module.event_writer.flush()
+        context = {"event_writer": app_module.event_writer.stats(), "llm": app_module.llm.stats()}
+        if app_module.answer_cache is not None:
+            context["answer_cache"] = app_module.answer_cache.stats()
+        app_module.pdf_renderer.shutdown()
+        return results, context
+    return results, {}
@@ -0,0 +1,65 @@
+# backend/bench/micro.py
+"""Micro-benchmarks de las funciones del camino caliente.
+
+- ``detect_intent``: clasificación con el autómata de intents.
+- ``save_event``: coste de encolar en la petición y tiempo hasta confirmar en
+  disco (``flush``).
+- ``generate_tramite_pdf``: render síncrono de un PDF.
+"""
+import random
+import time
+
+from bench.common import summarize
+from bench.load import PREGUNTAS_LLM, setup_inprocess
+from bench.seed import GRADOS, NOMBRES, PREGUNTAS, TIPOS
+
+
+def timed(name, fn, args_iter, extra=None):
+    latencies = []
+    start = time.perf_counter()
+    for args in args_iter:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(name, latencies, time.perf_counter() - start, extra=extra)
+
+
+def bench_detect_intent(app_module, n, rnd):
+    textos = [(rnd.choice(PREGUNTAS + PREGUNTAS_LLM),) for _ in range(n)]
+    return timed("detect_intent", app_module.detect_intent, textos)
+
+
+def bench_save_event(app_module, n, rnd):
+    events = [("message_sent", None, rnd.choice(PREGUNTAS), "web") for _ in range(n)]
+    result = timed("save_event", app_module.save_event, events)
+    t0 = time.perf_counter()
+    app_module.event_writer.flush(timeout=60)
+    result["flush_s"] = round(time.perf_counter() - t0, 4)
+    result["event_writer"] = app_module.event_writer.stats()
+    return result
+
+
+def bench_generate_pdf(app_module, n, rnd):
+    jobs = [
+        (100000 + i, rnd.choice(TIPOS), {"nombre": rnd.choice(NOMBRES), "grado": rnd.choice(GRADOS)})
+        for i in range(n)
+    ]
+    return timed("generate_tramite_pdf", app_module.generate_tramite_pdf, jobs)
+
+
+MICRO = {
+    "detect_intent": (bench_detect_intent, 1.0),
+    "save_event": (bench_save_event, 1.0),
+    "generate_tramite_pdf": (bench_generate_pdf, 0.02),
+}
+
+
+def run_micro(names, iterations, data_dir=None, seed=1):
+    app_module = setup_inprocess(data_dir)
+    rnd = random.Random(seed)
+    results = []
+    for name in names:
+        fn, scale = MICRO[name]
+        results.append(fn(app_module, max(1, int(iterations * scale)), rnd))
+    app_module.pdf_renderer.shutdown()
+    return results
@@ -0,0 +1,119 @@
+# backend/bench/seed.py
+"""Generadores de datos deterministas para ``tramites.db`` y ``edubot.db``.
+
+Con la misma semilla se generan exactamente las mismas filas, así dos commits
+se comparan sobre los mismos datos. Los inserts van en lotes con
+``executemany`` y ``synchronous=OFF`` para llegar a 10^6 filas en segundos.
+"""
+import json
+import random
+import sqlite3
+import time
+
+from storage import migrate_events, migrate_tramites
+
+TIPOS = ["constancia", "calificaciones", "inasistencia", "pazysalvo"]
+GRADOS = [f"{g}°" for g in range(1, 12)]
+NOMBRES = ["Ana", "Luis", "María", "José", "Camila", "Andrés", "Valentina", "Santiago", "Sofía", "Mateo"]
+APELLIDOS = ["Llanos", "Gómez", "Rodríguez", "Martínez", "Núñez", "Pérez", "Castillo", "Díaz", "Rojas", "Vargas"]
+PREGUNTAS = [
+    "¿Cuál es el horario de clase?",
+    "¿Cómo hago la matrícula?",
+    "Necesito una constancia de estudio",
+    "¿Cuándo son las vacaciones?",
+    "¿Qué ruta de bus me sirve?",
+    "¿Dónde veo mis notas?",
+    "¿Hay becas para el próximo año?",
+    "¿Cuál es el uniforme de educación física?",
+]
+INTENTS = ["horario", "matricula", "constancia", "calendario", "ruta", "respuesta_directa", "error"]
+CHANNELS = ["web", "web", "web", "whatsapp"]
+
+# Un año escolar hacia atrás desde una fecha fija (resultados reproducibles)
+END_TS = int(time.mktime((2025, 12, 1, 0, 0, 0, 0, 0, -1)))
+YEAR = 365 * 24 * 3600
+
+
+def _fast(db):
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+
+
+def tramite_rows(n, seed=42):
+    rnd = random.Random(seed)
+    step = YEAR / max(n, 1)
+    start = END_TS - YEAR
+    for i in range(n):
+        tipo = rnd.choice(TIPOS)
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}"
+        documento = str(rnd.randint(10**9, 2 * 10**9))
+        grado = rnd.choice(GRADOS)
+        extra = {"documento": documento}
+        if tipo == "inasistencia":
+            extra["motivo"] = rnd.choice(["cita médica", "viaje familiar", "calamidad doméstica"])
+        elif tipo == "calificaciones":
+            extra["anio"] = rnd.choice(["2023", "2024", "2025"])
+        created_at = int(start + i * step)
+        fecha = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created_at))
+        yield (tipo, nombre, documento, grado, json.dumps(extra, ensure_ascii=False), fecha, created_at)
+
+
+def event_rows(n, seed=42):
+    rnd = random.Random(seed)
+    step_ms = YEAR * 1000 / max(n, 1)
+    start_ms = (END_TS - YEAR) * 1000
+    for i in range(n):
+        ts = int(start_ms + i * step_ms)
+        channel = rnd.choice(CHANNELS)
+        kind = rnd.random()
+        if kind < 0.45:
+            yield ("message_sent", None, rnd.choice(PREGUNTAS), channel, ts, None)
+        elif kind < 0.9:
+            yield ("message_received", rnd.choice(INTENTS), "respuesta", channel, ts, rnd.choice(PREGUNTAS))
+        elif kind < 0.97:
+            yield ("ollama_question", None, rnd.choice(PREGUNTAS), channel, ts, None)
+        else:
+            yield ("tramite_submitted", rnd.choice(TIPOS), "tramite", channel, ts, None)
+
+
+def _insert(db, sql, rows, batch):
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            db.executemany(sql, chunk)
+            db.commit()
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        db.executemany(sql, chunk)
+        db.commit()
+        total += len(chunk)
+    return total
+
+
+def seed_tramites(path, n, seed=42, batch=10000):
+    db = sqlite3.connect(path)
+    try:
+        _fast(db)
+        migrate_tramites(db)
+        return _insert(db, """
+            INSERT INTO tramites (tipo, nombre, documento, grado, extra, fecha, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, tramite_rows(n, seed), batch)
+    finally:
+        db.close()
+
+
+def seed_events(path, n, seed=42, batch=10000):
+    db = sqlite3.connect(path)
+    try:
+        _fast(db)
+        migrate_events(db)
+        return _insert(db, """
+            INSERT INTO events (event_type, intent, text, channel, timestamp, question)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, event_rows(n, seed), batch)
+    finally:
+        db.close()
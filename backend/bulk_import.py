@@ -0,0 +1,296 @@
+# backend/bulk_import.py
+"""Importación masiva de trámites desde CSV o JSON-lines.
+
+La entrada se lee línea a línea (nunca entera en memoria), cada fila se valida
+con las mismas reglas que ``POST /api/tramite`` y las filas válidas se
+insertan por lotes con ``executemany``, un commit por lote. Las filas
+inválidas no detienen la importación: se devuelven con su número de línea.
+Si SQLite rechaza un lote, se repite fila a fila para informar solo de las
+filas culpables.
+
+Los PDFs no se generan aquí: cada lote se entrega a ``on_batch`` para que el
+llamador los encole en ``PdfRenderer`` o los deje para más tarde.
+
+CSV: la primera fila es la cabecera (``tipo,nombre,grado`` y cualquier otra
+columna, que va a ``extra``). JSON-lines: un objeto por línea.
+
+Desde la línea de comandos:
+    python bulk_import.py alumnos.csv [--db tramites.db] [--lote 1000] [--pdfs]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_BATCH = 1000
+MAX_REPORTED_ERRORS = 1000
+
+INSERT_TRAMITE = """
+    INSERT INTO tramites (tipo, nombre, documento, grado, extra, fecha, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class TramiteError(ValueError):
+    """Trámite inválido (se responde 400 o se informa como error de fila)."""
+
+
+def validate_tramite(payload):
+    """Reglas de ``/api/tramite``; devuelve ``(tipo, nombre, grado, extra)``."""
+    if not isinstance(payload, dict):
+        raise TramiteError("Se esperaba un objeto JSON")
+    tipo = payload.get("tipo")
+    nombre = payload.get("nombre")
+    grado = payload.get("grado")
+    if not tipo or not nombre or not grado:
+        raise TramiteError("Faltan campos: tipo, nombre o grado")
+    for field, value in (("tipo", tipo), ("nombre", nombre), ("grado", grado),
+                         ("documento", payload.get("documento"))):
+        if value is not None and not _is_scalar(value):
+            raise TramiteError(f"El campo {field} debe ser texto o número")
+    extra = {k: v for k, v in payload.items() if k not in ("tipo", "nombre", "grado")}
+    return tipo, nombre, grado, extra
+
+
+def _is_scalar(value):
+    # Columnas de tramites: SQLite no acepta objetos ni enteros de más de 64 bits.
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return False
+    return not isinstance(value, int) or -2**63 <= value < 2**63
+
+
+def tramite_values(tipo, nombre, grado, extra, now):
+    """Parámetros de ``INSERT_TRAMITE``."""
+    return (tipo, nombre, extra.get("documento"), grado, json.dumps(extra, ensure_ascii=False),
+            time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)), int(now))
+
+
+# -----------------------
+# Lectura de la entrada
+# -----------------------
+def detect_format(first_line):
+    return "jsonl" if first_line.lstrip().startswith("{") else "csv"
+
+
+def _jsonl_records(lines):
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield lineno, json.loads(line), None
+        except ValueError as e:
+            yield lineno, None, f"JSON inválido: {e}"
+
+
+def _csv_records(lines):
+    reader = csv.DictReader(lines)
+    if reader.fieldnames:
+        reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+    for rec in reader:
+        if None in rec:
+            yield reader.line_num, None, "La fila tiene más columnas que la cabecera"
+            continue
+        payload = {k: v.strip() for k, v in rec.items() if k and v and v.strip()}
+        if payload:
+            yield reader.line_num, payload, None
+
+
+def read_records(lines, fmt=None):
+    """Itera ``(línea, payload, error)`` sobre un iterable de líneas de texto.
+
+    Sin ``fmt`` se deduce de la primera línea no vacía (``{`` → JSON-lines).
+    """
+    if fmt is not None and fmt not in FORMATS:
+        raise TramiteError(f"Formato desconocido: {fmt} (use csv o jsonl)")
+    lines = iter(lines)
+    head = []
+    try:
+        for line in lines:
+            head.append(line)
+            if line.strip():
+                break
+    except UnicodeDecodeError as e:
+        raise TramiteError(f"La entrada no es UTF-8: {e}")
+    if fmt is None:
+        fmt = detect_format(head[-1]) if head else "csv"
+    lines = itertools.chain(head, lines)
+    return _jsonl_records(lines) if fmt == "jsonl" else _csv_records(lines)
+
+
+def text_lines(binary):
+    """Envuelve un flujo binario (cuerpo de la petición, fichero) como texto UTF-8."""
+    if not isinstance(binary, io.BufferedIOBase):
+        binary = io.BufferedReader(binary)
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+# -----------------------
+# Inserción por lotes
+# -----------------------
+class ImportResult:
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.inserted = 0
+        self.ids = []
+        self.errors = []
+        self.error_count = 0
+        self.fatal = None
+        self.max_errors = max_errors
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"linea": line, "error": message})
+
+    def to_dict(self):
+        return {
+            "ok": self.fatal is None,
+            "insertados": self.inserted,
+            "ids": self.ids,
+            "errores": self.errors,
+            "total_errores": self.error_count,
+            **({"error": self.fatal} if self.fatal else {}),
+        }
+
+
+# Errores de SQLite o al convertir un valor para SQLite (texto con surrogates,
+# enteros enormes dentro de extra, etc.).
+_ROW_ERRORS = (sqlite3.Error, ValueError, OverflowError)
+
+
+def _insert_batch(db, rows):
+    db.executemany(INSERT_TRAMITE, rows)
+    # El lote va en una sola transacción de escritura: con AUTOINCREMENT los
+    # ids son consecutivos y terminan en last_insert_rowid().
+    last = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+    db.commit()
+    return list(range(last - len(rows) + 1, last + 1))
+
+
+def _insert_rows(db, rows):
+    """Inserta fila a fila; devuelve un id o la excepción por cada fila."""
+    results = []
+    for row in rows:
+        try:
+            results.append(db.execute(INSERT_TRAMITE, row).lastrowid)
+        except _ROW_ERRORS as e:
+            results.append(e)
+    db.commit()
+    return results
+
+
+def import_tramites(db, records, batch_size=DEFAULT_BATCH, on_batch=None, now=None):
+    """Valida e inserta ``records`` (de ``read_records``); devuelve ``ImportResult``.
+
+    Tras cada commit llama a ``on_batch(jobs, segundos)`` con
+    ``jobs = [(id, tipo, datos_pdf, None), ...]``, listo para
+    ``PdfRenderer.regenerate``. Los lotes ya confirmados se conservan aunque
+    la entrada falle más adelante (queda en ``result.fatal``).
+    """
+    result = ImportResult()
+    now = time.time() if now is None else now
+    rows, pending = [], []
+
+    def flush():
+        start = time.perf_counter()
+        try:
+            ids = _insert_batch(db, rows)
+        except _ROW_ERRORS:
+            # Alguna fila pasó la validación pero SQLite la rechaza: se repite
+            # el lote fila a fila para informar solo de esas.
+            db.rollback()
+            ids = _insert_rows(db, rows)
+        elapsed = time.perf_counter() - start
+        jobs = []
+        for tid, (line, tipo, data) in zip(ids, pending):
+            if isinstance(tid, Exception):
+                result.add_error(line, f"No se pudo guardar: {tid}")
+            else:
+                jobs.append((tid, tipo, data, None))
+        result.inserted += len(jobs)
+        result.ids.extend(job[0] for job in jobs)
+        rows.clear()
+        pending.clear()
+        if on_batch is not None:
+            on_batch(jobs, elapsed)
+
+    line = 0
+    try:
+        for line, payload, error in records:
+            if error is None:
+                try:
+                    tipo, nombre, grado, extra = validate_tramite(payload)
+                except TramiteError as e:
+                    error = str(e)
+            if error is not None:
+                result.add_error(line, error)
+                continue
+            rows.append(tramite_values(tipo, nombre, grado, extra, now))
+            pending.append((line, tipo, {"nombre": nombre, "grado": grado, **extra}))
+            if len(rows) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        result.fatal = f"Entrada ilegible después de la línea {line}: {e}"
+    if rows:
+        flush()
+    return result
+
+
+# -----------------------
+# Línea de comandos
+# -----------------------
+if __name__ == "__main__":
+    from pdf_worker import PdfRenderer
+    from storage import Database, migrate_tramites
+
+    logging.basicConfig(level=logging.INFO)
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Importa trámites desde CSV o JSON-lines")
+    parser.add_argument("fichero", help="ruta del fichero o - para la entrada estándar")
+    parser.add_argument("--formato", choices=FORMATS, default=None, help="por defecto se deduce")
+    parser.add_argument("--db", default=os.path.join(here, "tramites.db"))
+    parser.add_argument("--lote", type=int, default=DEFAULT_BATCH, help="filas por transacción")
+    parser.add_argument("--pdfs", action="store_true", help="generar los PDFs al importar")
+    parser.add_argument("--pdf-dir", default=os.path.join(here, "pdfs"))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    renderer = None
+    if args.pdfs:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+        renderer = PdfRenderer(args.pdf_dir, workers=args.workers)
+
+    def render(jobs, seconds):
+        _, errors = renderer.regenerate(jobs)
+        for tid, err in errors:
+            logging.error("PDF del trámite %s: %s", tid, err)
+
+    if args.fichero == "-":
+        source = text_lines(sys.stdin.buffer)
+    else:
+        source = open(args.fichero, encoding="utf-8-sig", newline="")
+    db = Database(args.db).connect()
+    start = time.perf_counter()
+    try:
+        migrate_tramites(db)
+        result = import_tramites(db, read_records(source, args.formato), args.lote,
+                                 on_batch=render if renderer else None)
+    finally:
+        db.close()
+        source.close()
+        if renderer is not None:
+            renderer.shutdown()
+
+    for err in result.errors:
+        logging.error("Línea %s: %s", err["linea"], err["error"])
+    if result.fatal:
+        logging.error(result.fatal)
+    logging.info("%s trámites importados en %.1f s (%s errores)",
+                 result.inserted, time.perf_counter() - start, result.error_count)
+    sys.exit(1 if result.fatal or result.error_count else 0)
@@ -14,7 +14,8 @@ db.run(`
     documento TEXT,
     grado TEXT,
     extra JSON,
-    fecha TEXT
+    fecha TEXT,
+    created_at INTEGER
   )
 `);
 
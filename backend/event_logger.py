@@ -0,0 +1,280 @@
+# backend/event_logger.py
+"""Escritura de eventos en segundo plano para ``save_event``.
+
+Las peticiones solo encolan el evento; un único hilo escritor lo inserta en
+``edubot.db`` por lotes (``executemany`` + un ``commit`` por lote) cuando se
+junta ``batch_size`` eventos o pasa ``flush_interval`` segundos. Así la latencia
+de la petición no depende del fsync y no hay varios hilos peleando por el
+bloqueo de escritura de SQLite.
+
+La cola está acotada: con la política ``drop`` un evento que no cabe se
+descarta (y se cuenta); con ``block`` la petición espera hasta
+``block_timeout`` segundos antes de descartarlo. Tras ``close`` también se
+descartan los eventos nuevos.
+
+Si SQLite rechaza un lote, se repite fila a fila: solo se pierden (y se
+cuentan en ``errors``) los eventos que no se pueden guardar.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+INSERT_EVENT = """
+    INSERT INTO events (event_type, intent, text, channel, timestamp, question)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+# Errores de SQLite o al convertir un valor para SQLite (como en bulk_import)
+_ROW_ERRORS = (sqlite3.Error, ValueError, OverflowError)
+
+
+def _column_value(value):
+    """Valor guardable en una columna: los objetos y listas se guardan como JSON."""
+    if value is None or isinstance(value, (str, float)):
+        return value
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+class EventWriter:
+    def __init__(self, db_path, batch_size=200, flush_interval=0.5, max_queue=10000,
+                 policy="drop", block_timeout=1.0, wal=True):
+        if policy not in ("drop", "block"):
+            raise ValueError("policy debe ser 'drop' o 'block'")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.wal = wal
+        # Gancho opcional on_flush(filas, segundos) tras cada lote confirmado
+        self.on_flush = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # -----------------------
+    # API para las peticiones
+    # -----------------------
+    def start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        return self
+
+    def submit(self, event_type, intent=None, text=None, channel="web", timestamp=None, question=None):
+        if self._closed:
+            self._drop("Escritor de eventos cerrado")
+            return False
+        if self._thread is None:
+            self.start()
+        row = (event_type, intent, text, channel,
+               timestamp if timestamp is not None else int(time.time() * 1000), question)
+        row = tuple(_column_value(v) for v in row)
+        try:
+            if self.policy == "block":
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._drop("Cola de eventos llena")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _drop(self, reason, count=1):
+        with self._lock:
+            before = self.dropped
+            self.dropped += count
+            dropped = self.dropped
+        if before == 0 or before // 1000 != dropped // 1000:
+            logging.warning("%s: %s eventos descartados", reason, dropped)
+
+    def flush(self, timeout=5.0):
+        """Espera a que todo lo encolado hasta ahora esté confirmado en disco."""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Vacía la cola y detiene el hilo escritor; después ``submit`` descarta."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if not thread.is_alive():
+            self._discard_pending()
+
+    def _discard_pending(self):
+        """Cuenta como descartado lo que se encoló mientras se cerraba."""
+        left = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is not _STOP:
+                left += 1
+        if left:
+            self._drop("Escritor de eventos cerrado", left)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "policy": self.policy,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "batches": self.batches,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.batches, 3) if self.batches else 0.0,
+            }
+
+    # -----------------------
+    # Hilo escritor
+    # -----------------------
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        if self.wal:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _write(self, db, batch):
+        start = time.perf_counter()
+        written = len(batch)
+        try:
+            self._insert_batch(db, batch)
+        except sqlite3.OperationalError:
+            # Base ocupada o bloqueada: un reintento del lote y, si no, fila a fila
+            time.sleep(0.05)
+            try:
+                self._insert_batch(db, batch)
+            except _ROW_ERRORS:
+                written = self._insert_rows(db, batch)
+        except _ROW_ERRORS:
+            # Alguna fila no se puede guardar: fila a fila para no perder el resto
+            written = self._insert_rows(db, batch)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.written += written
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._total_flush_ms += elapsed
+        if self.on_flush is not None and written:
+            self.on_flush(written, elapsed / 1000)
+
+    def _insert_batch(self, db, batch):
+        try:
+            db.executemany(INSERT_EVENT, batch)
+            db.commit()
+        except _ROW_ERRORS:
+            db.rollback()
+            raise
+
+    def _insert_rows(self, db, batch):
+        """Inserta fila a fila; devuelve cuántas filas se guardaron."""
+        written, last_error = 0, None
+        for row in batch:
+            try:
+                db.execute(INSERT_EVENT, row)
+                written += 1
+            except _ROW_ERRORS as e:
+                last_error = e
+        try:
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            written, last_error = 0, e
+        failed = len(batch) - written
+        if failed:
+            with self._lock:
+                self.errors += failed
+            logging.error("No se pudieron guardar %s de %s eventos: %s", failed, len(batch), last_error)
+        return written
+
+    def _run(self):
+        db = self._connect()
+        batch, markers = [], []
+        stop = False
+        try:
+            while not stop:
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    if isinstance(item, _Flush):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                if batch:
+                    try:
+                        self._write(db, batch)
+                    except Exception:
+                        # Lo que no sea de SQLite (p. ej. on_flush): el hilo sigue vivo
+                        logging.exception("Error en el escritor de eventos")
+                        if db.in_transaction:
+                            db.rollback()
+                    batch = []
+                for m in markers:
+                    m.done.set()
+                markers = []
+        finally:
+            db.close()
+
+
+def create_writer_from_env(db_path):
+    return EventWriter(
+        db_path,
+        batch_size=int(os.environ.get("EVENT_LOG_BATCH", "200")),
+        flush_interval=float(os.environ.get("EVENT_LOG_INTERVAL", "0.5")),
+        max_queue=int(os.environ.get("EVENT_LOG_QUEUE", "10000")),
+        policy=os.environ.get("EVENT_LOG_POLICY", "drop"),
+        wal=os.environ.get("EVENT_LOG_WAL", "1") != "0",
+    )
@@ -0,0 +1,125 @@
+# backend/fake_llm_server.py
+"""Servidor falso compatible con ``/api/generate`` de Ollama.
+
+Permite probar el backend sin conexión ni modelo descargado. Las respuestas
+son deterministas y se generan token a token con un retardo configurable.
+
+Uso:
+    python fake_llm_server.py --port 11434 --token-delay 0.02
+    OLLAMA_URL=http://127.0.0.1:11434 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_reply(prompt):
+    """Respuesta determinista a partir de la última pregunta del prompt."""
+    pregunta = prompt
+    for line in prompt.splitlines():
+        if line.startswith("Pregunta:"):
+            pregunta = line[len("Pregunta:"):].strip()
+    return f"Respuesta simulada sobre: {pregunta}. Consulta secretaría para más detalles."
+
+
+def tokenize(text):
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas: sin esto Nagle + ACK
+    # retardado añaden ~40 ms por respuesta en conexiones keep-alive.
+    disable_nagle_algorithm = True
+    token_delay = 0.0
+    startup_delay = 0.0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "fake"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        model = payload.get("model", "fake")
+        tokens = tokenize(fake_reply(payload.get("prompt", "")))
+        limit = (payload.get("options") or {}).get("num_predict")
+        if limit:
+            tokens = tokens[:limit]
+        time.sleep(self.startup_delay)
+
+        if not payload.get("stream", True):
+            time.sleep(self.token_delay * len(tokens))
+            self._send_json(200, {"model": model, "response": "".join(tokens), "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for tok in tokens:
+                time.sleep(self.token_delay)
+                self._chunk({"model": model, "response": tok, "done": False})
+            self._chunk({"model": model, "response": "", "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente canceló: se deja de generar.
+            self.close_connection = True
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_fake_server(host="127.0.0.1", port=0, token_delay=0.0, startup_delay=0.0):
+    """Arranca el servidor en un hilo y lo devuelve (``server.server_address``)."""
+    handler = type("Handler", (FakeOllamaHandler,), {
+        "token_delay": token_delay,
+        "startup_delay": startup_delay,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Ollama falso para pruebas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--startup-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    srv = start_fake_server(args.host, args.port, args.token_delay, args.startup_delay)
+    print(f"Servidor LLM falso en http://{args.host}:{srv.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,201 @@
+# backend/intent_matcher.py
+"""Detector de intents compilado (Aho–Corasick sobre texto normalizado).
+
+Todas las palabras clave de todos los intents se compilan una sola vez en un
+autómata, de modo que clasificar un texto cuesta O(longitud del texto) sin
+importar cuántos intents o sinónimos haya. Las coincidencias deben empezar al
+inicio de una palabra ("hora" encaja en "horario" pero no en "ahora").
+
+Las definiciones son una lista de ``{"intent", "keywords", "reply"}`` y se
+pueden cargar desde un JSON o desde una tabla SQLite ``intents(intent, keyword,
+reply)``. ``IntentRouter`` permite recargarlas en caliente: el autómata nuevo se
+construye aparte y se sustituye de forma atómica.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from textnorm import normalizar
+
+
+class IntentMatcher:
+    def __init__(self, definitions):
+        self.replies = {}
+        self._order = {}
+        # Nodo i: transiciones, enlace de fallo y salidas (intent, keyword)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pos, d in enumerate(definitions):
+            intent = d["intent"]
+            self.replies[intent] = d.get("reply", "")
+            self._order.setdefault(intent, pos)
+            for kw in d.get("keywords", []):
+                norm = normalizar(kw)
+                if norm:
+                    self._add(norm, intent)
+        self._build()
+
+    def _add(self, keyword, intent):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (intent, keyword) not in self._out[node]:
+            self._out[node].append((intent, keyword))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @property
+    def size(self):
+        return len(self._goto)
+
+    def match(self, text):
+        """Intents que coinciden, ordenados por puntuación descendente.
+
+        La puntuación es la suma de la longitud de las palabras clave distintas
+        encontradas, así las coincidencias más específicas pesan más.
+        """
+        t = normalizar(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found = {}
+        node = 0
+        for i, ch in enumerate(t):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for intent, kw in out[node]:
+                start = i - len(kw) + 1
+                if start == 0 or t[start - 1] == " ":
+                    found.setdefault(intent, set()).add(kw)
+        scores = [(intent, sum(len(k) for k in kws)) for intent, kws in found.items()]
+        scores.sort(key=lambda s: (-s[1], self._order[s[0]]))
+        return scores
+
+    def best(self, text):
+        scores = self.match(text)
+        return scores[0][0] if scores else None
+
+    def first(self, text):
+        """El intent definido antes entre los que coinciden (como una cadena if/elif)."""
+        scores = self.match(text)
+        return min(scores, key=lambda s: self._order[s[0]])[0] if scores else None
+
+    def match_many(self, texts):
+        return [self.match(t) for t in texts]
+
+
+# -----------------------
+# Carga de definiciones
+# -----------------------
+def load_definitions(source):
+    """Lee definiciones de un ``.json`` o de la tabla ``intents`` de un ``.db``."""
+    if source.endswith(".json"):
+        with open(source, encoding="utf-8") as f:
+            return json.load(f)
+    db = sqlite3.connect(source)
+    try:
+        rows = db.execute("SELECT intent, keyword, reply FROM intents ORDER BY rowid").fetchall()
+    finally:
+        db.close()
+    defs = {}
+    for intent, keyword, reply in rows:
+        d = defs.setdefault(intent, {"intent": intent, "keywords": [], "reply": reply or ""})
+        d["keywords"].append(keyword)
+        if reply and not d["reply"]:
+            d["reply"] = reply
+    return list(defs.values())
+
+
+def validate_definitions(defs):
+    """Comprueba la forma de las definiciones; lanza ``ValueError`` si no sirven."""
+    if not isinstance(defs, list):
+        raise ValueError("las definiciones deben ser una lista")
+    for pos, d in enumerate(defs):
+        if not isinstance(d, dict) or not isinstance(d.get("intent"), str) or not d["intent"]:
+            raise ValueError(f"definición {pos}: falta \"intent\"")
+        keywords = d.get("keywords", [])
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise ValueError(f"definición {pos}: \"keywords\" debe ser una lista de textos")
+        if not isinstance(d.get("reply", ""), str):
+            raise ValueError(f"definición {pos}: \"reply\" debe ser texto")
+    return defs
+
+
+class IntentRouter:
+    """Matcher intercambiable en caliente.
+
+    Si hay ``source`` (fichero), se comprueba su fecha de modificación como
+    mucho cada ``check_interval`` segundos y se recompila al cambiar. Si el
+    fichero no se puede leer o no es válido se sigue usando el matcher anterior
+    (el error queda en ``last_error``) hasta que vuelva a cambiar.
+    """
+
+    def __init__(self, default_definitions, source=None, check_interval=5.0):
+        self.default_definitions = default_definitions
+        self.source = source
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.last_error = None
+        self.matcher = IntentMatcher(default_definitions)
+        if source:
+            self.reload()
+
+    def reload(self):
+        """Recompila desde ``source`` (o las definiciones por defecto)."""
+        with self._lock:
+            defs = self.default_definitions
+            mtime = None
+            try:
+                if self.source:
+                    mtime = os.path.getmtime(self.source)
+                    defs = validate_definitions(load_definitions(self.source))
+                matcher = IntentMatcher(defs)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logging.warning("No se pudieron cargar intents de %s: %s", self.source, e)
+                self.last_error = str(e)
+                # Con la fecha anotada no se reintenta en cada comprobación,
+                # solo cuando el fichero vuelva a cambiar.
+                if mtime is not None:
+                    self._mtime = mtime
+                return self.matcher
+            self.matcher = matcher
+            self._mtime = mtime
+            self.last_error = None
+            logging.info("Intents compilados: %s intents, %s nodos", len(matcher.replies), matcher.size)
+            return matcher
+
+    def current(self):
+        if self.source:
+            now = time.monotonic()
+            if now - self._checked >= self.check_interval:
+                self._checked = now
+                try:
+                    changed = os.path.getmtime(self.source) != self._mtime
+                except OSError:
+                    changed = False
+                if changed:
+                    self.reload()
+        return self.matcher
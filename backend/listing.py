@@ -0,0 +1,196 @@
+# backend/listing.py
+"""Listados paginados de ``/api/tramites`` y ``/api/logs``.
+
+- Paginación por cursor (keyset) sobre ``(created_at, id)`` / ``(timestamp, id)``:
+  cada página es una búsqueda en el índice, sin ``OFFSET``.
+- Filtros respaldados por índices y búsqueda de texto con FTS5 (si SQLite no
+  lo trae se recurre a ``LIKE``).
+- Salida JSON en streaming: las filas se leen con ``fetchmany`` y se escriben
+  según se leen, así la memoria no crece con el tamaño del resultado.
+
+La respuesta sigue siendo un array JSON; el cursor de la página siguiente va en
+la cabecera ``X-Next-Cursor`` (y en ``Link: rel="next"``).
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+MAX_LIMIT = 1000
+FETCH_SIZE = 500
+
+
+class ListingError(ValueError):
+    """Parámetro de consulta inválido (se responde 400)."""
+
+
+# -----------------------
+# Cursores y parámetros
+# -----------------------
+def encode_cursor(sort_value, row_id):
+    raw = f"{sort_value}:{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+        return int(sort_value), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ListingError("cursor inválido")
+
+
+def parse_limit(value, default):
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ListingError("limit debe ser un entero")
+    if limit < 1:
+        raise ListingError("limit debe ser mayor que 0")
+    return min(limit, MAX_LIMIT)
+
+
+def parse_time(value, end_of_day=False):
+    """Epoch en segundos o fecha ISO (``2025-02-10`` o ``2025-02-10T08:00:00``)."""
+    if value in (None, ""):
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ListingError(f"fecha inválida: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    ts = int(dt.timestamp())
+    if end_of_day and len(value) == 10:
+        ts += 86400 - 1
+    return ts
+
+
+def fts_query(text):
+    """Convierte texto libre en una consulta FTS5 segura (prefijo por palabra)."""
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words)
+
+
+# -----------------------
+# Consultas
+# -----------------------
+def tramites_query(args, fts_available=True):
+    """SQL y parámetros para ``/api/tramites``; ``limit`` es ``None`` si no se pidió."""
+    where, params = [], []
+    for col in ("tipo", "grado"):
+        if args.get(col):
+            where.append(f"{col} = ?")
+            params.append(args[col])
+    desde = parse_time(args.get("desde"))
+    hasta = parse_time(args.get("hasta"), end_of_day=True)
+    if desde is not None:
+        where.append("created_at >= ?")
+        params.append(desde)
+    if hasta is not None:
+        where.append("created_at <= ?")
+        params.append(hasta)
+    q = (args.get("q") or "").strip()
+    if q:
+        if fts_available:
+            where.append("id IN (SELECT rowid FROM tramites_fts WHERE tramites_fts MATCH ?)")
+            params.append(fts_query(q))
+        else:
+            where.append("(nombre LIKE ? OR extra LIKE ?)")
+            params += [f"%{q}%", f"%{q}%"]
+    if args.get("cursor"):
+        where.append("(created_at, id) < (?, ?)")
+        params += list(decode_cursor(args["cursor"]))
+    limit = parse_limit(args.get("limit"), None)
+
+    sql = "SELECT id, tipo, nombre, grado, extra, created_at FROM tramites"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    return sql, params, limit
+
+
+def logs_query(args):
+    """SQL y parámetros para ``/api/logs`` (por defecto, los 1000 más recientes)."""
+    where, params = [], []
+    for col in ("event_type", "intent", "channel"):
+        if args.get(col):
+            where.append(f"{col} = ?")
+            params.append(args[col])
+    desde = parse_time(args.get("desde"))
+    hasta = parse_time(args.get("hasta"), end_of_day=True)
+    if desde is not None:
+        where.append("timestamp >= ?")
+        params.append(desde * 1000)
+    if hasta is not None:
+        where.append("timestamp <= ?")
+        params.append(hasta * 1000 + 999)
+    if args.get("cursor"):
+        where.append("(timestamp, id) < (?, ?)")
+        params += list(decode_cursor(args["cursor"]))
+    limit = parse_limit(args.get("limit"), MAX_LIMIT)
+
+    sql = "SELECT id, event_type, intent, text, channel, timestamp FROM events"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    return sql, params, limit
+
+
+# -----------------------
+# Ejecución y salida
+# -----------------------
+def run_listing(database, sql, params, limit, sort_key):
+    """Ejecuta la consulta y devuelve ``(generador_json, next_cursor, close)``.
+
+    Con ``limit`` la página (acotada por ``MAX_LIMIT``) se lee entera para saber
+    si hay siguiente; sin ``limit`` se recorre todo el resultado en streaming.
+    La conexión vuelve al pool al terminar el generador o al llamar a ``close``
+    (lo que ocurra primero), aunque el cuerpo nunca llegue a leerse.
+    """
+    db = database.acquire()
+    released = []
+
+    def close():
+        if not released:
+            released.append(True)
+            database.release(db)
+
+    try:
+        cur = db.execute(sql, params)
+        next_cursor = None
+        if limit is not None:
+            rows = cur.fetchall()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(last[sort_key], last["id"])
+            batches = iter([rows])
+        else:
+            batches = iter(lambda: cur.fetchmany(FETCH_SIZE), [])
+    except Exception:
+        close()
+        raise
+
+    def generate():
+        try:
+            yield "["
+            sep = ""
+            for batch in batches:
+                if batch:
+                    yield sep + ",".join(json.dumps(dict(row), sort_keys=True) for row in batch)
+                    sep = ","
+            yield "]\n"
+        finally:
+            close()
+
+    return generate(), next_cursor, close
+
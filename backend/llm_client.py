@@ -0,0 +1,330 @@
+# backend/llm_client.py
+"""Cliente de inferencia para el modelo local.
+
+En lugar de lanzar ``ollama run`` por cada mensaje, se mantiene un cliente
+HTTP de larga vida contra el servidor de Ollama (``ollama serve``) con:
+
+- pool de conexiones keep-alive,
+- límite de concurrencia acotado,
+- cola de espera con backpressure (si está llena se rechaza de inmediato),
+- deadline por petición (la espera en cola descuenta del mismo plazo),
+- modo streaming (``stream``) que entrega tokens a medida que se generan y
+  cancela la generación si el consumidor cierra el generador.
+
+El backend se elige con ``LLM_BACKEND``: ``http`` (por defecto) o ``cli``
+(comportamiento anterior con subprocess, útil si no hay servidor).
+"""
+import codecs
+import http.client
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+DEFAULT_MODEL = "llama3.2:1b"
+DEFAULT_URL = "http://127.0.0.1:11434"
+
+
+class LLMError(Exception):
+    """Error genérico del servicio de IA."""
+
+
+class LLMTimeout(LLMError):
+    """La petición superó su deadline (en cola o generando)."""
+
+
+class LLMBusy(LLMError):
+    """La cola de espera está llena: se aplica backpressure."""
+
+
+# -----------------------
+# Concurrencia y cola
+# -----------------------
+class ConcurrencyLimiter:
+    """Semáforo con cola de espera acotada y deadline."""
+
+    def __init__(self, max_concurrency=4, max_queue=32):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self, deadline):
+        if not self._sem.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise LLMBusy("Cola de inferencia llena")
+                self.waiting += 1
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._sem.acquire(timeout=remaining):
+                    raise LLMTimeout("Deadline agotado esperando turno")
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._sem.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+            }
+
+
+# -----------------------
+# Pool de conexiones HTTP
+# -----------------------
+class ConnectionPool:
+    """Pool LIFO de ``http.client.HTTPConnection`` keep-alive."""
+
+    def __init__(self, base_url, size=4):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self, timeout):
+        try:
+            conn = self._idle.get_nowait()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=timeout), False
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def discard(self, conn):
+        conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# -----------------------
+# Backends
+# -----------------------
+class OllamaHTTPClient:
+    """Cliente para la API HTTP de Ollama (``/api/generate``)."""
+
+    def __init__(self, base_url=DEFAULT_URL, model=DEFAULT_MODEL, max_concurrency=4,
+                 max_queue=32, timeout=45.0, options=None, keep_alive="30m"):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.options = options or {}
+        self.keep_alive = keep_alive
+        self.limiter = ConcurrencyLimiter(max_concurrency, max_queue)
+        self.pool = ConnectionPool(base_url, size=max_concurrency)
+
+    def _body(self, prompt, stream):
+        return json.dumps({
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": self.options,
+            "keep_alive": self.keep_alive,
+        })
+
+    def _post(self, conn, body):
+        conn.request("POST", "/api/generate", body=body,
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        if resp.status != 200:
+            detail = resp.read()[:200].decode("utf-8", "ignore")
+            raise LLMError(f"Ollama respondió {resp.status}: {detail}")
+        return resp
+
+    def _open(self, body, deadline):
+        """Envía la petición reutilizando conexión; reintenta una vez si estaba caducada."""
+        for _ in range(2):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeout("Deadline agotado antes de enviar la petición")
+            conn, reused = self.pool.acquire(remaining)
+            try:
+                return conn, self._post(conn, body)
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.pool.discard(conn)
+                if not reused:
+                    raise
+            except Exception:
+                self.pool.discard(conn)
+                raise
+        raise LLMError("No se pudo conectar con el servidor del modelo")
+
+    def generate(self, prompt, timeout=None):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        with self.limiter.slot(deadline):
+            try:
+                conn, resp = self._open(self._body(prompt, False), deadline)
+            except TimeoutError as e:
+                raise LLMTimeout(str(e)) from e
+            try:
+                data = json.loads(resp.read())
+            except TimeoutError as e:
+                self.pool.discard(conn)
+                raise LLMTimeout(str(e)) from e
+            except Exception:
+                self.pool.discard(conn)
+                raise
+            self.pool.release(conn)
+            return data.get("response", "")
+
+    def stream(self, prompt, timeout=None):
+        """Generador de tokens. Cerrarlo antes de terminar corta la conexión,
+        lo que hace que Ollama aborte la generación."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        with self.limiter.slot(deadline):
+            try:
+                conn, resp = self._open(self._body(prompt, True), deadline)
+            except TimeoutError as e:
+                raise LLMTimeout(str(e)) from e
+            done = False
+            try:
+                while not done:
+                    if time.monotonic() > deadline:
+                        raise LLMTimeout("Deadline agotado durante la generación")
+                    try:
+                        line = resp.readline()
+                    except TimeoutError as e:
+                        raise LLMTimeout(str(e)) from e
+                    if not line:
+                        break
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise LLMError(data["error"])
+                    done = bool(data.get("done"))
+                    if data.get("response"):
+                        yield data["response"]
+            finally:
+                if done:
+                    resp.read()
+                    self.pool.release(conn)
+                else:
+                    self.pool.discard(conn)
+
+    def stats(self):
+        return {"backend": "http", "model": self.model, **self.limiter.stats()}
+
+    def close(self):
+        self.pool.close()
+
+
+class SubprocessClient:
+    """Backend anterior: un ``ollama run`` por petición."""
+
+    def __init__(self, model=DEFAULT_MODEL, max_concurrency=4, max_queue=32,
+                 timeout=45.0, options=None):
+        self.model = model
+        self.timeout = timeout
+        self.options = options or {}
+        self.limiter = ConcurrencyLimiter(max_concurrency, max_queue)
+
+    def generate(self, prompt, timeout=None):
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        with self.limiter.slot(deadline):
+            try:
+                result = subprocess.run(
+                    ["ollama", "run", self.model, "--", prompt],
+                    capture_output=True,
+                    text=True,
+                    encoding="utf-8",
+                    errors="ignore",
+                    timeout=max(deadline - time.monotonic(), 0.1),
+                    env={**os.environ, "OLLAMA_OPTIONS": json.dumps(self.options)}
+                )
+            except subprocess.TimeoutExpired as e:
+                raise LLMTimeout(str(e)) from e
+            except OSError as e:
+                raise LLMError(str(e)) from e
+            return result.stdout
+
+    def stream(self, prompt, timeout=None):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        with self.limiter.slot(deadline):
+            try:
+                proc = subprocess.Popen(
+                    ["ollama", "run", self.model, "--", prompt],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    env={**os.environ, "OLLAMA_OPTIONS": json.dumps(self.options)}
+                )
+            except OSError as e:
+                raise LLMError(str(e)) from e
+            watchdog = threading.Timer(max(deadline - time.monotonic(), 0.1), proc.kill)
+            watchdog.start()
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+            try:
+                while True:
+                    chunk = proc.stdout.read1(4096)
+                    if not chunk:
+                        break
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                if proc.wait() != 0 and time.monotonic() >= deadline:
+                    raise LLMTimeout("Deadline agotado durante la generación")
+            finally:
+                watchdog.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+
+    def stats(self):
+        return {"backend": "cli", "model": self.model, **self.limiter.stats()}
+
+    def close(self):
+        pass
+
+
+def create_client_from_env():
+    """Construye el cliente según variables de entorno."""
+    backend = os.environ.get("LLM_BACKEND", "http").lower()
+    common = {
+        "model": os.environ.get("OLLAMA_MODEL", DEFAULT_MODEL),
+        "max_concurrency": int(os.environ.get("LLM_MAX_CONCURRENCY", "4")),
+        "max_queue": int(os.environ.get("LLM_MAX_QUEUE", "32")),
+        "timeout": float(os.environ.get("LLM_TIMEOUT", "45")),
+        "options": {"num_predict": int(os.environ.get("LLM_NUM_PREDICT", "100"))},
+    }
+    if backend == "cli":
+        client = SubprocessClient(**common)
+    else:
+        client = OllamaHTTPClient(base_url=os.environ.get("OLLAMA_URL", DEFAULT_URL), **common)
+    logging.info("Cliente LLM: %s", client.stats())
+    return client
@@ -0,0 +1,294 @@
+# backend/metrics.py
+"""Métricas en formato Prometheus y trazas muestreadas por petición.
+
+Sin dependencias: contadores, gauges e histogramas con etiquetas, guardados en
+diccionarios protegidos por un lock por métrica (unas decenas de ns por
+observación, se puede dejar activo en producción). ``REGISTRY.render()``
+produce el texto que sirve ``/metrics``.
+
+Las trazas dividen una petición en etapas (``span``). Solo se registran para
+una fracción ``sample_rate`` de peticiones (o si el cliente envía
+``X-Trace: 1``); fuera de una traza, ``span`` apenas cuesta una lectura de
+``contextvars``.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _fmt_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            acc = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                labels = _fmt_labels(self.labelnames, key, [("le", _fmt_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {acc}")
+            base = _fmt_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Valores leídos en el momento del scrape (p. ej. estadísticas de otro módulo).
+
+    ``fn`` devuelve una lista de ``(dict_etiquetas, valor)``.
+    """
+
+    def __init__(self, name, help, fn, kind="gauge", labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self):
+        lines = self.header()
+        for labels, value in self.fn():
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, self._key(labels))} {_fmt_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, fn, kind="gauge", labelnames=()):
+        return self.register(CallbackMetric(name, help, fn, kind, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            try:
+                lines.extend(m.render())
+            except Exception as e:
+                lines.append(f"# error en {m.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# -----------------------
+# Trazas muestreadas
+# -----------------------
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.duration_ms = None
+        self.attrs = {}
+        self.held = False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+            "spans": [
+                {"name": n, "offset_ms": round(o, 3), "duration_ms": round(d, 3)}
+                for n, o, d in self.spans
+            ],
+        }
+
+
+class Tracer:
+    def __init__(self, sample_rate=0.0, max_traces=200):
+        self.sample_rate = sample_rate
+        self._recent = deque(maxlen=max_traces)
+
+    def begin(self, name, force=False):
+        """Empieza una traza si toca muestrear; devuelve el token para ``end``."""
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        trace = Trace(name)
+        return _current_trace.set(trace)
+
+    def end(self, token, **attrs):
+        if token is None:
+            return
+        trace = _current_trace.get()
+        _current_trace.reset(token)
+        if trace is not None:
+            trace.attrs.update(attrs)
+            if not trace.held:
+                self._finish(trace)
+
+    def hold(self):
+        """Mantiene abierta la traza actual después de ``end`` hasta ``release``.
+
+        Para respuestas en streaming: el generador corre cuando la petición ya
+        ha terminado y fuera de su contexto, así que sus spans se registran con
+        ``record`` o dentro de ``attach``.
+        """
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.held = True
+        return trace
+
+    def release(self, trace, **attrs):
+        if trace is not None:
+            trace.attrs.update(attrs)
+            self._finish(trace)
+
+    @contextmanager
+    def attach(self, trace):
+        """Hace de ``trace`` la traza actual dentro del bloque (sin ``yield`` dentro)."""
+        token = _current_trace.set(trace)
+        try:
+            yield
+        finally:
+            _current_trace.reset(token)
+
+    def record(self, trace, name, start, end=None):
+        """Añade un span con tiempos de ``time.perf_counter()``."""
+        if trace is None:
+            return
+        end = time.perf_counter() if end is None else end
+        trace.spans.append((name, (start - trace.start) * 1000, (end - start) * 1000))
+
+    def _finish(self, trace):
+        trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 3)
+        self._recent.append(trace)
+
+    @contextmanager
+    def span(self, name):
+        trace = _current_trace.get()
+        if trace is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(trace, name, start)
+
+    def recent(self, limit=50):
+        return [t.to_dict() for t in list(self._recent)[-limit:]][::-1]
+
+
+@contextmanager
+def timed(histogram, tracer, span_name, **labels):
+    """Observa la duración en ``histogram`` y la registra como span si hay traza."""
+    with tracer.span(span_name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start, **labels)
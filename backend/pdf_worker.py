@@ -0,0 +1,334 @@
+# backend/pdf_worker.py
+"""Generación de PDFs de trámites en segundo plano.
+
+``PdfRenderer`` encola cada PDF en un pool de procesos, de modo que
+``/api/tramite`` responde sin esperar a reportlab. Cada proceso del pool
+importa reportlab (lo más caro, unos 200 ms) y carga las fuentes con un
+documento de prueba al arrancar, no con el primer trámite. Cada PDF se dibuja
+entero: reportlab no permite reutilizar páginas ya dibujadas entre documentos
+distintos sin dependencias extra.
+
+Los ficheros se escriben en un temporal y se renombran al terminar: si
+``tramite_<id>.pdf`` existe, está completo.
+
+Regenerar en bloque desde la línea de comandos:
+    python pdf_worker.py regenerar [--desde ID] [--workers N]
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+HEADER_TITLE = "Gestor de Trámites - Institución Educativa"
+
+# reportlab importado en este proceso (ver _reportlab)
+_REPORTLAB = None
+
+
+def pdf_path_for(pdf_dir, tramite_id):
+    return os.path.join(pdf_dir, f"tramite_{tramite_id}.pdf")
+
+
+def _reportlab():
+    """``(Canvas, tamaño de página)`` de reportlab, importado una vez por proceso.
+
+    Devuelve ``()`` si reportlab no está instalado.
+    """
+    global _REPORTLAB
+    if _REPORTLAB is None:
+        try:
+            from reportlab.lib.pagesizes import A4
+            from reportlab.pdfgen import canvas
+            _REPORTLAB = (canvas.Canvas, A4)
+        except ImportError as e:
+            logging.warning("reportlab no disponible (%s); se generarán PDFs de texto.", e)
+            _REPORTLAB = ()
+    return _REPORTLAB
+
+
+def warm_up():
+    """Inicializador de los procesos del pool: importa reportlab y carga sus
+    fuentes dibujando un documento en memoria."""
+    rl = _reportlab()
+    if rl:
+        try:
+            _draw(io.BytesIO(), "prueba", {"nombre": "prueba"}, "", rl)
+        except Exception as e:
+            logging.warning("No se pudo preparar reportlab: %s", e)
+
+
+def _draw(path, tipo, data, fecha, rl):
+    canvas_class, pagesize = rl
+    c = canvas_class(path, pagesize=pagesize)
+    width, height = pagesize
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(40, height - 60, HEADER_TITLE)
+    c.setFont("Helvetica", 10)
+    c.drawString(40, height - 80, f"Trámite: {tipo}")
+    c.drawString(40, height - 95, f"Fecha: {fecha}")
+    c.line(40, height - 100, width - 40, height - 100)
+
+    y = height - 130
+    c.setFont("Helvetica", 11)
+    for k, v in (data or {}).items():
+        c.drawString(50, y, f"{k}: {v}")
+        y -= 18
+        if y < 60:
+            c.showPage()
+            y = height - 60
+
+    c.showPage()
+    c.save()
+
+
+def _draw_fallback(path, tipo, data, fecha):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Gestor de Trámites - Documento (fallback)\n\n")
+        f.write(f"Trámite: {tipo}\n")
+        f.write(f"Fecha: {fecha}\n\n")
+        for k, v in (data or {}).items():
+            f.write(f"{k}: {v}\n")
+
+
+def render_tramite_pdf(pdf_dir, tramite_id, tipo, data, fecha=None):
+    """Dibuja el PDF del trámite y devuelve su ruta (se ejecuta en el pool)."""
+    fecha = fecha or time.strftime("%Y-%m-%d %H:%M:%S")
+    pdf_path = pdf_path_for(pdf_dir, tramite_id)
+    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    rl = _reportlab()
+    try:
+        if not rl:
+            raise RuntimeError("reportlab no disponible")
+        _draw(tmp_path, tipo, data, fecha, rl)
+    except Exception as e:
+        if rl:
+            logging.warning("No se pudo generar PDF con reportlab: %s. Guardando fallback.", e)
+        _draw_fallback(tmp_path, tipo, data, fecha)
+    os.replace(tmp_path, pdf_path)
+    return pdf_path
+
+
+def _render_row(args):
+    """Variante para ``map``: un error no corta el resto del lote."""
+    try:
+        render_tramite_pdf(*args)
+        return args[1], None
+    except Exception as e:
+        return args[1], str(e)
+
+
+def _process_context():
+    """Procesos del pool sin ``fork``: el servidor tiene varios hilos y un hijo
+    bifurcado podría heredar un lock tomado (logging, SQLite)."""
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["pdf_worker"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _future_error(future):
+    if future.cancelled():
+        return RuntimeError("cancelado")
+    return future.exception()
+
+
+class PdfRenderer:
+    """Cola de trabajos de PDF sobre un pool de procesos.
+
+    Con ``workers=0`` se renderiza en línea (útil para depurar).
+    """
+
+    def __init__(self, pdf_dir, workers=None, use_processes=True):
+        self.pdf_dir = pdf_dir
+        self.workers = (os.cpu_count() or 2) if workers is None else workers
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._errors = {}
+        # Gancho opcional on_done(segundos, ok) con el tiempo desde que se encoló
+        self.on_done = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    try:
+                        self._executor = ProcessPoolExecutor(
+                            self.workers, mp_context=_process_context(), initializer=warm_up)
+                    except (OSError, NotImplementedError) as e:
+                        logging.warning("Sin pool de procesos (%s); se usarán hilos.", e)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, initializer=warm_up)
+            return self._executor
+
+    def _discard_pool(self, executor):
+        """Olvida un pool roto (p. ej. un proceso murió) para crear otro al próximo uso."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        logging.warning("Pool de PDFs roto; se creará uno nuevo.")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, tramite_id, tipo, data, fecha=None):
+        """Encola el PDF; devuelve el estado inicial (``pendiente`` o ``listo``)."""
+        start = time.perf_counter()
+        if self.workers == 0:
+            render_tramite_pdf(self.pdf_dir, tramite_id, tipo, data, fecha)
+            if self.on_done is not None:
+                self.on_done(time.perf_counter() - start, True)
+            return "listo"
+        for attempt in range(2):
+            executor = self._pool()
+            try:
+                future = executor.submit(render_tramite_pdf, self.pdf_dir, tramite_id, tipo, data, fecha)
+                break
+            except BrokenExecutor:
+                self._discard_pool(executor)
+                if attempt:
+                    raise
+        with self._lock:
+            self._jobs[tramite_id] = future
+            self._errors.pop(tramite_id, None)
+        future.add_done_callback(lambda f, tid=tramite_id: self._finished(tid, f, start, executor))
+        return "pendiente"
+
+    def _finished(self, tramite_id, future, start, executor):
+        error = _future_error(future)
+        if isinstance(error, BrokenExecutor):
+            self._discard_pool(executor)
+        if self.on_done is not None:
+            self.on_done(time.perf_counter() - start, error is None)
+        with self._lock:
+            if self._jobs.get(tramite_id) is future:
+                del self._jobs[tramite_id]
+            if error is not None:
+                logging.error("Error generando PDF del trámite %s: %s", tramite_id, error)
+                self._errors[tramite_id] = str(error)
+                while len(self._errors) > 1000:
+                    self._errors.pop(next(iter(self._errors)))
+
+    def status(self, tramite_id):
+        with self._lock:
+            future = self._jobs.get(tramite_id)
+            failed = tramite_id in self._errors
+        # El estado sale del propio future: wait() puede despertar antes de que
+        # _finished lo saque de _jobs.
+        if future is not None:
+            if not future.done():
+                return "pendiente"
+            return "error" if _future_error(future) is not None else "listo"
+        if failed:
+            return "error"
+        if os.path.exists(pdf_path_for(self.pdf_dir, tramite_id)):
+            return "listo"
+        return "desconocido"
+
+    def wait(self, tramite_id, timeout):
+        """Espera hasta ``timeout`` segundos a que termine el PDF y devuelve su estado."""
+        with self._lock:
+            future = self._jobs.get(tramite_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.status(tramite_id)
+
+    def regenerate(self, rows, chunksize=16):
+        """Renderiza en paralelo ``(id, tipo, data, fecha)``; devuelve (ok, errores)."""
+        args = [(self.pdf_dir, *row) for row in rows]
+        if self.workers == 0:
+            results = map(_render_row, args)
+        else:
+            executor = self._pool()
+            results = executor.map(_render_row, args, chunksize=chunksize)
+        ok, errors = 0, []
+        try:
+            for tramite_id, error in results:
+                if error is None:
+                    ok += 1
+                else:
+                    errors.append((tramite_id, error))
+        except BrokenExecutor:
+            self._discard_pool(executor)
+            raise
+        return ok, errors
+
+    def pending(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def create_renderer_from_env(pdf_dir):
+    workers = os.environ.get("PDF_WORKERS")
+    return PdfRenderer(pdf_dir, workers=int(workers) if workers else None)
+
+
+def _job(row):
+    tid, tipo, nombre, grado, extra, created_at = row
+    try:
+        extra = json.loads(extra or "{}")
+    except ValueError:
+        extra = {}
+    fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)) if created_at else None
+    return tid, tipo, {"nombre": nombre, "grado": grado, **extra}, fecha
+
+
+def tramite_rows(db, desde=0):
+    """Filas de ``tramites`` listas para ``PdfRenderer.regenerate``."""
+    cur = db.execute(
+        "SELECT id, tipo, nombre, grado, extra, created_at FROM tramites WHERE id >= ? ORDER BY id",
+        (desde,),
+    )
+    for row in cur:
+        yield _job(row)
+
+
+def tramite_job(db, tramite_id):
+    """Como ``tramite_rows`` para un solo trámite; ``None`` si no existe."""
+    row = db.execute(
+        "SELECT id, tipo, nombre, grado, extra, created_at FROM tramites WHERE id = ?",
+        (tramite_id,),
+    ).fetchone()
+    return _job(row) if row is not None else None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Regenera los PDFs de los trámites")
+    parser.add_argument("accion", choices=["regenerar"])
+    parser.add_argument("--db", default=os.path.join(here, "tramites.db"))
+    parser.add_argument("--pdf-dir", default=os.path.join(here, "pdfs"))
+    parser.add_argument("--desde", type=int, default=0, help="primer id a regenerar")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs(args.pdf_dir, exist_ok=True)
+    conn = sqlite3.connect(args.db)
+    rows = list(tramite_rows(conn, args.desde))
+    conn.close()
+    renderer = PdfRenderer(args.pdf_dir, workers=args.workers)
+    start = time.perf_counter()
+    ok, errors = renderer.regenerate(rows)
+    renderer.shutdown()
+    for tid, err in errors:
+        logging.error("Trámite %s: %s", tid, err)
+    logging.info("%s PDFs regenerados en %.1f s (%s errores)", ok, time.perf_counter() - start, len(errors))
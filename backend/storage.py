@@ -0,0 +1,273 @@
+# backend/storage.py
+"""Capa de almacenamiento SQLite para ``edubot.db`` y ``tramites.db``.
+
+``Database`` mantiene un pool de conexiones reutilizables. Cada conexión se
+configura una sola vez al crearse (WAL, ``synchronous=NORMAL``, mmap, caché y
+``busy_timeout``) y conserva su caché de sentencias preparadas
+(``cached_statements``) entre peticiones. ``connection()`` siempre devuelve la
+conexión al pool, deshaciendo cualquier transacción a medias si hubo error.
+
+También contiene las migraciones del esquema de ``tramites``, que ha divergido
+entre el backend Flask (``created_at``) y el servidor Express (``documento``,
+``fecha``).
+
+Uso desde la línea de comandos:
+    python storage.py migrate [ruta.db ...]
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,  # ~16 MB
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+
+class Database:
+    def __init__(self, path, pool_size=8, wal=True, pragmas=None, cached_statements=256):
+        self.path = path
+        self.wal = wal
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def connect(self):
+        """Conexión nueva, ya configurada, fuera del pool."""
+        db = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            timeout=self.pragmas["busy_timeout"] / 1000,
+        )
+        db.row_factory = sqlite3.Row
+        if self.wal:
+            db.execute("PRAGMA journal_mode=WAL")
+        for name, value in self.pragmas.items():
+            db.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self.created += 1
+        return db
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.connect()
+
+    def release(self, db):
+        """Devuelve la conexión al pool, sin transacciones pendientes."""
+        try:
+            if db.in_transaction:
+                db.rollback()
+        except sqlite3.Error:
+            db.close()
+            return
+        try:
+            self._idle.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+    @contextmanager
+    def connection(self):
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        return {"path": os.path.basename(self.path), "idle": self._idle.qsize(), "created": self.created}
+
+
+# -----------------------
+# Esquema de eventos
+# -----------------------
+def migrate_events(db):
+    """Tabla ``events`` de ``edubot.db`` y sus índices.
+
+    ``question`` guarda, en los eventos de respuesta, la pregunta que se
+    respondió (para las estadísticas de preguntas sin respuesta).
+    """
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        intent TEXT,
+        text TEXT,
+        channel TEXT,
+        timestamp INTEGER,
+        question TEXT
+    )
+    """)
+    if "question" not in _columns(db, "events"):
+        db.execute("ALTER TABLE events ADD COLUMN question TEXT")
+        logging.info("Migración events: columna question añadida")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, timestamp, id)")
+    db.commit()
+
+
+# -----------------------
+# Migraciones de tramites
+# -----------------------
+TRAMITES_COLUMNS = [
+    ("tipo", "TEXT"),
+    ("nombre", "TEXT"),
+    ("documento", "TEXT"),
+    ("grado", "TEXT"),
+    ("extra", "TEXT"),
+    ("fecha", "TEXT"),
+    ("created_at", "INTEGER"),
+]
+
+
+def _columns(db, table):
+    return {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+
+
+def migrate_tramites(db):
+    """Lleva ``tramites`` al esquema común de Flask y Express.
+
+    Añade las columnas que falten, rellena ``created_at``/``fecha`` a partir de
+    la otra y crea un trigger para que las filas que inserta Express (solo con
+    ``fecha``) también tengan ``created_at``. También crea los índices del
+    listado y el índice de texto completo.
+    """
+    cols = ",\n        ".join(f"{name} {kind}" for name, kind in TRAMITES_COLUMNS)
+    db.execute(f"""
+    CREATE TABLE IF NOT EXISTS tramites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        {cols}
+    )
+    """)
+    existing = _columns(db, "tramites")
+    for name, kind in TRAMITES_COLUMNS:
+        if name not in existing:
+            db.execute(f"ALTER TABLE tramites ADD COLUMN {name} {kind}")
+            logging.info("Migración tramites: columna %s añadida", name)
+    db.execute("""
+        UPDATE tramites SET created_at = CAST(strftime('%s', fecha) AS INTEGER)
+        WHERE created_at IS NULL AND fecha IS NOT NULL
+    """)
+    db.execute("""
+        UPDATE tramites SET fecha = strftime('%Y-%m-%dT%H:%M:%fZ', created_at, 'unixepoch')
+        WHERE fecha IS NULL AND created_at IS NOT NULL
+    """)
+    db.execute("""
+    CREATE TRIGGER IF NOT EXISTS tramites_created_at AFTER INSERT ON tramites
+    WHEN NEW.created_at IS NULL
+    BEGIN
+        UPDATE tramites
+        SET created_at = CAST(strftime('%s', COALESCE(NEW.fecha, 'now')) AS INTEGER)
+        WHERE id = NEW.id;
+    END
+    """)
+    if _unescape_extra(db) and has_fts(db):
+        db.execute("INSERT INTO tramites_fts (tramites_fts) VALUES ('rebuild')")
+    # Índices para el listado paginado por (created_at, id) y sus filtros
+    db.execute("CREATE INDEX IF NOT EXISTS idx_tramites_created ON tramites (created_at, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_tramites_tipo ON tramites (tipo, created_at, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_tramites_grado ON tramites (grado, created_at, id)")
+    ensure_tramites_fts(db)
+    db.commit()
+
+
+def _unescape_extra(db):
+    """Reescribe ``extra`` guardado con escapes ``\\uXXXX`` como UTF-8.
+
+    Con los escapes, FTS y ``LIKE`` ven ``cita m\\u00e9dica`` en lugar de
+    ``cita médica``. Devuelve cuántas filas se corrigieron.
+    """
+    fixed = []
+    for tid, extra in db.execute(r"SELECT id, extra FROM tramites WHERE instr(extra, '\u') > 0"):
+        try:
+            text = json.dumps(json.loads(extra), ensure_ascii=False)
+        except ValueError:
+            continue
+        if text != extra:
+            fixed.append((text, tid))
+    if fixed:
+        db.executemany("UPDATE tramites SET extra = ? WHERE id = ?", fixed)
+        logging.info("Migración tramites: %s filas de extra pasadas a UTF-8", len(fixed))
+    return len(fixed)
+
+
+def ensure_tramites_fts(db):
+    """Índice FTS5 sobre ``nombre`` y ``extra``; devuelve ``False`` si no hay FTS5."""
+    if has_fts(db):
+        return True
+    try:
+        db.execute("""
+        CREATE VIRTUAL TABLE tramites_fts USING fts5(
+            nombre, extra,
+            content='tramites', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        logging.warning("FTS5 no disponible, la búsqueda usará LIKE: %s", e)
+        return False
+    db.executescript("""
+    CREATE TRIGGER IF NOT EXISTS tramites_fts_ai AFTER INSERT ON tramites BEGIN
+        INSERT INTO tramites_fts (rowid, nombre, extra) VALUES (NEW.id, NEW.nombre, NEW.extra);
+    END;
+    CREATE TRIGGER IF NOT EXISTS tramites_fts_ad AFTER DELETE ON tramites BEGIN
+        INSERT INTO tramites_fts (tramites_fts, rowid, nombre, extra)
+        VALUES ('delete', OLD.id, OLD.nombre, OLD.extra);
+    END;
+    CREATE TRIGGER IF NOT EXISTS tramites_fts_au AFTER UPDATE OF nombre, extra ON tramites BEGIN
+        INSERT INTO tramites_fts (tramites_fts, rowid, nombre, extra)
+        VALUES ('delete', OLD.id, OLD.nombre, OLD.extra);
+        INSERT INTO tramites_fts (rowid, nombre, extra) VALUES (NEW.id, NEW.nombre, NEW.extra);
+    END;
+    INSERT INTO tramites_fts (tramites_fts) VALUES ('rebuild');
+    """)
+    logging.info("Índice FTS5 de tramites creado")
+    return True
+
+
+def has_fts(db):
+    return db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tramites_fts'"
+    ).fetchone() is not None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Uso: python storage.py migrate [ruta.db ...]")
+        sys.exit(2)
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[2:] or [
+        os.path.join(here, "tramites.db"),
+        os.path.join(here, "..", "tramites.db"),
+    ]
+    for path in paths:
+        if not os.path.exists(path):
+            logging.info("Se omite %s (no existe)", path)
+            continue
+        db = sqlite3.connect(path)
+        try:
+            migrate_tramites(db)
+            logging.info("Migrado %s", os.path.normpath(path))
+        finally:
+            db.close()
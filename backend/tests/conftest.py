@@ -0,0 +1,58 @@
+# backend/tests/conftest.py
+"""Fixtures comunes: modelo falso, bases de datos temporales y la app Flask.
+
+Se ejecutan desde ``backend/`` con ``python -m pytest -q``. Nada toca
+``edubot.db``, ``tramites.db`` ni ``pdfs/``: ``app`` se importa con las rutas
+de datos apuntando a una carpeta temporal y ``OLLAMA_URL`` a
+``fake_llm_server``.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import start_fake_server  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_llm():
+    """Servidor Ollama falso; ``token_delay`` da tiempo a cancelar un stream."""
+    server = start_fake_server(token_delay=0.02)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="session")
+def app_module(fake_llm, tmp_path_factory):
+    data = tmp_path_factory.mktemp("datos")
+    os.environ.update({
+        "EDUBOT_DB": str(data / "edubot.db"),
+        "TRAMITES_DB": str(data / "tramites.db"),
+        "PDF_DIR": str(data / "pdfs"),
+        "OLLAMA_URL": fake_llm,
+        "PDF_WORKERS": "0",
+        "ANSWER_CACHE_SIZE": "0",
+        "EVENT_LOG_INTERVAL": "0.05",
+        "ANALYTICS_INTERVAL": "3600",
+    })
+    os.makedirs(os.environ["PDF_DIR"], exist_ok=True)
+    import app
+    yield app
+    app.event_writer.close()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def saved_events(app_module, monkeypatch):
+    """Eventos que guardaría ``save_event``, sin escribir en ``edubot.db``."""
+    events = []
+    monkeypatch.setattr(app_module, "save_event",
+                        lambda event_type, **fields: events.append((event_type, fields)))
+    return events
@@ -0,0 +1,119 @@
+# backend/tests/test_analytics.py
+import pytest
+
+from analytics import migrate_rollups, query_stats, refresh_rollups, reset_rollups, watermark
+from storage import Database, migrate_events
+
+DAY = 1700006400  # 2023-11-15 00:00 UTC
+
+
+@pytest.fixture
+def events_db(tmp_path):
+    """Conexión a un ``edubot.db`` temporal y vacío."""
+    db = Database(str(tmp_path / "edubot.db")).connect()
+    migrate_events(db)
+    yield db
+    db.close()
+
+
+def _insert(db, rows):
+    db.executemany("""
+        INSERT INTO events (event_type, intent, text, channel, timestamp, question)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    db.commit()
+
+
+def _conversation(ts, pregunta, intent, channel="web"):
+    return [
+        ("message_sent", None, pregunta, channel, ts * 1000, None),
+        ("message_received", intent, "respuesta", channel, ts * 1000 + 1, pregunta),
+    ]
+
+
+def _rollup_rows(db):
+    return (db.execute("SELECT * FROM events_rollup ORDER BY 1, 2, 3, 4, 5").fetchall(),
+            db.execute("SELECT * FROM questions_rollup ORDER BY 1, 2, 3, 4").fetchall())
+
+
+def test_refresh_is_idempotent(events_db):
+    migrate_rollups(events_db)
+    _insert(events_db, _conversation(DAY + 60, "¿Hay becas?", "respuesta_directa")
+            + _conversation(DAY + 120, "horario", "horario"))
+    assert refresh_rollups(events_db) == 4
+    before = _rollup_rows(events_db)
+
+    assert refresh_rollups(events_db) == 4
+    assert _rollup_rows(events_db) == before
+    assert query_stats(events_db, desde=DAY, hasta=DAY + 3600)["total"] == 4
+
+
+def test_refresh_only_reads_new_events(events_db):
+    migrate_rollups(events_db)
+    _insert(events_db, _conversation(DAY + 60, "¿Hay becas?", "respuesta_directa"))
+    refresh_rollups(events_db)
+    _insert(events_db, _conversation(DAY + 90, "¿Hay becas?", "error"))
+    assert refresh_rollups(events_db) == watermark(events_db) == 4
+
+    stats = query_stats(events_db, desde=DAY, hasta=DAY + 3600, granularidad="minuto")
+    assert stats["por_tipo"] == {"message_sent": 2, "message_received": 2}
+    assert stats["serie"] == [
+        {"bucket": DAY + 60, "event_type": "message_received", "count": 2},
+        {"bucket": DAY + 60, "event_type": "message_sent", "count": 2},
+    ]
+    assert stats["sin_intent"] == [{"pregunta": "¿Hay becas?", "count": 2}]
+    assert stats["sin_respuesta"] == [{"pregunta": "¿Hay becas?", "count": 1}]
+
+
+def test_chunked_refresh_matches_single_pass(events_db):
+    migrate_rollups(events_db)
+    rows = []
+    for i in range(40):
+        rows += _conversation(DAY + i * 700, f"pregunta {i % 3}", ["horario", "respuesta_directa", "error"][i % 3],
+                              channel=["web", "whatsapp"][i % 2])
+    _insert(events_db, rows)
+
+    refresh_rollups(events_db)
+    single = _rollup_rows(events_db)
+    reset_rollups(events_db)
+    assert watermark(events_db) == 0
+    assert refresh_rollups(events_db, chunk=7, max_chunks=2) == 14
+    assert refresh_rollups(events_db, chunk=7) == 80
+    assert _rollup_rows(events_db) == single
+
+
+def test_rates_use_recorded_questions(events_db):
+    migrate_rollups(events_db)
+    # Dos conversaciones intercaladas en el mismo canal: cada respuesta lleva su pregunta
+    _insert(events_db, [
+        ("message_sent", None, "horario", "web", DAY * 1000, None),
+        ("message_sent", None, "¿Hay becas?", "web", DAY * 1000 + 1, None),
+        ("message_received", "respuesta_directa", "Sí", "web", DAY * 1000 + 2, "¿Hay becas?"),
+        ("message_received", "horario", "7:00", "web", DAY * 1000 + 3, "horario"),
+        ("ollama_answer", "error", "No disponible", "web", DAY * 1000 + 4, "¿Y el uniforme?"),
+    ])
+    refresh_rollups(events_db)
+    stats = query_stats(events_db, desde=DAY, hasta=DAY + 86399)
+    assert stats["fallback_rate"] == 0.5
+    assert stats["sin_respuesta_rate"] == round(1 / 3, 4)
+    assert stats["sin_intent"] == [{"pregunta": "¿Hay becas?", "count": 1}]
+    assert stats["sin_respuesta"] == [{"pregunta": "¿Y el uniforme?", "count": 1}]
+
+
+def test_granularity_limits(events_db):
+    migrate_rollups(events_db)
+    assert query_stats(events_db, desde=DAY, hasta=DAY + 3600)["granularidad"] == "minuto"
+    assert query_stats(events_db, desde=DAY, hasta=DAY + 86400)["granularidad"] == "hora"
+    assert query_stats(events_db)["granularidad"] == "dia"
+
+
+def test_stats_endpoint_is_up_to_date(app_module, client):
+    # ANALYTICS_INTERVAL=3600 en conftest: /api/stats no depende del intervalo
+    before = client.get("/api/stats").get_json()["marca"]
+    client.post("/api/message", json={"text": "¿Dónde queda la cafetería nueva?", "channel": "stats"})
+    assert app_module.event_writer.flush()
+    stats = client.get("/api/stats?channel=stats").get_json()
+    assert stats["marca"] >= before + 2
+    assert stats["por_tipo"]["message_received"] >= 1
+    assert {"pregunta": "¿Dónde queda la cafetería nueva?", "count": 1} in stats["sin_intent"]
+    assert client.get("/api/stats?granularidad=semana").status_code == 400
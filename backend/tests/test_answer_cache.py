@@ -0,0 +1,117 @@
+# backend/tests/test_answer_cache.py
+import sqlite3
+import time
+
+import answer_cache
+
+from answer_cache import AnswerCache, cache_namespace
+
+
+def test_normalized_key():
+    cache = AnswerCache("ns")
+    cache.put("¿Cuándo es la matrícula?", "En enero")
+    assert cache.get("cuando es la MATRICULA") == "En enero"
+    assert cache.stats()["hits"] == 1
+
+
+def test_ttl_expires_entries():
+    cache = AnswerCache("ns", ttl=0.05)
+    cache.put("horario", "7:00")
+    assert cache.get("horario") == "7:00"
+    time.sleep(0.1)
+    assert cache.get("horario") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AnswerCache("ns", max_entries=2)
+    cache.put("uno", "1")
+    cache.put("dos", "2")
+    assert cache.get("uno") == "1"
+    cache.put("tres", "3")
+    assert cache.get("dos") is None
+    assert cache.get("uno") == "1"
+    assert cache.get("tres") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_persistent_entries_survive_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ns = cache_namespace("llama3.2:1b", "Pregunta: {texto}")
+    AnswerCache(ns, db_path=path).put("horario", "7:00")
+
+    cache = AnswerCache(ns, db_path=path)
+    assert cache.get("horario") == "7:00"
+
+
+def test_namespace_change_invalidates(tmp_path):
+    path = str(tmp_path / "cache.db")
+    old = cache_namespace("llama3.2:1b", "Pregunta: {texto}")
+    AnswerCache(old, db_path=path).put("horario", "7:00")
+
+    for ns in (cache_namespace("otro-modelo", "Pregunta: {texto}"),
+               cache_namespace("llama3.2:1b", "Otra plantilla: {texto}")):
+        assert ns != old
+        cache = AnswerCache(ns, db_path=path)
+        assert cache.get("horario") is None
+    assert AnswerCache(old, db_path=path).get("horario") is None
+
+
+def test_similar_questions():
+    cache = AnswerCache("ns", similarity=0.5)
+    cache.put("¿Cuál es el horario de la biblioteca?", "8 a 5")
+    assert cache.get("horario biblioteca") == "8 a 5"
+    assert cache.get("horario piscina") is None
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_app_answers_repeated_questions_from_cache(app_module, client, saved_events, monkeypatch):
+    cache = AnswerCache("pruebas")
+    monkeypatch.setattr(app_module, "answer_cache", cache)
+    primera = client.post("/api/ollama-chat", json={"pregunta": "¿Cuándo son las vacaciones?"}).get_json()
+    segunda = client.post("/api/ollama-chat", json={"pregunta": "cuando son las VACACIONES"}).get_json()
+    assert segunda["respuesta"] == primera["respuesta"]
+    assert cache.stats()["hits"] == 1
+
+    r = client.post("/api/ollama-chat/stream", json={"pregunta": "¿cuándo son las vacaciones?"})
+    assert primera["respuesta"] in r.get_data(as_text=True)
+    assert cache.stats()["hits"] == 2
+
+
+def test_persistent_tier_is_trimmed(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_cache, "TRIM_EVERY", 5)
+    path = str(tmp_path / "cache.db")
+    cache = AnswerCache("ns", max_entries=2, db_path=path, db_max_entries=3)
+    for i in range(12):
+        cache.put(f"pregunta {i}", str(i))
+    with sqlite3.connect(path) as db:
+        claves = {row[0] for row in db.execute("SELECT clave FROM answer_cache")}
+    # Poda en la 5.ª y 10.ª escritura: quedan las 3 más recientes de entonces y las 2 siguientes
+    assert claves == {f"pregunta {i}" for i in range(7, 12)}
+
+    # Al abrir también se borran las caducadas
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE answer_cache SET expires_at = 0 WHERE clave = 'pregunta 11'")
+    reopened = AnswerCache("ns", max_entries=2, db_path=path, db_max_entries=3)
+    assert reopened.get("pregunta 11") is None
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] == 3
+
+
+def test_persistent_read_errors_count_as_misses(tmp_path):
+    cache = AnswerCache("ns", db_path=str(tmp_path / "cache.db"))
+    cache._db.execute("DROP TABLE answer_cache")
+    assert cache.get("horario") is None
+    cache.put("horario", "7:00")
+    assert cache.get("horario") == "7:00"
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["db_errors"] == 2
+
+
+def test_non_text_questions(client):
+    for url in ("/api/ollama-chat", "/api/ollama-chat/stream"):
+        r = client.post(url, json={"pregunta": 5})
+        assert r.status_code == 400
+        assert r.get_json() == {"error": "pregunta debe ser texto"}
+    assert client.post("/api/chat", json={"pregunta": 5}).status_code == 200
+    assert AnswerCache("ns").get(5) is None
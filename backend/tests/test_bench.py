@@ -0,0 +1,43 @@
+# backend/tests/test_bench.py
+import sqlite3
+
+from bench.common import percentile, summarize
+from bench.seed import event_rows, seed_events, seed_tramites, tramite_rows
+
+
+def test_same_seed_same_rows():
+    assert list(tramite_rows(50, seed=7)) == list(tramite_rows(50, seed=7))
+    assert list(event_rows(50, seed=7)) == list(event_rows(50, seed=7))
+    assert list(tramite_rows(50, seed=7)) != list(tramite_rows(50, seed=8))
+
+
+def test_seed_databases(tmp_path):
+    tramites, events = str(tmp_path / "tramites.db"), str(tmp_path / "edubot.db")
+    assert seed_tramites(tramites, 2500, batch=1000) == 2500
+    assert seed_events(events, 300) == 300
+    with sqlite3.connect(tramites) as db:
+        assert db.execute("SELECT COUNT(*), COUNT(created_at) FROM tramites").fetchone() == (2500, 2500)
+    with sqlite3.connect(events) as db:
+        assert db.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 300
+
+
+def test_percentiles_and_summary():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.0505
+    assert percentile([], 99) == 0.0
+    result = summarize("prueba", values, elapsed=2.0, errors=1)
+    assert result["count"] == 100 and result["throughput_per_s"] == 50.0
+    assert result["p99_ms"] == 99.01 and result["max_ms"] == 100.0
+
+
+def test_seed_command_never_writes_to_the_cwd(tmp_path, monkeypatch):
+    from bench.__main__ import main
+
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    main(["seed", "--tramites", "5", "--events", "5"])
+    assert list(cwd.iterdir()) == []
+
+    main(["seed", "--tramites", "5", "--events", "5", "--data-dir", str(tmp_path / "datos" / "nuevo")])
+    assert sorted(p.name for p in (tmp_path / "datos" / "nuevo").glob("*.db")) == ["edubot.db", "tramites.db"]
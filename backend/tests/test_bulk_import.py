@@ -0,0 +1,113 @@
+# backend/tests/test_bulk_import.py
+import io
+import json
+
+import pytest
+
+from bulk_import import TramiteError, import_tramites, read_records, validate_tramite
+from storage import Database, migrate_tramites
+
+
+@pytest.fixture
+def tramites_db(tmp_path):
+    """Conexión a un ``tramites.db`` temporal y vacío."""
+    db = Database(str(tmp_path / "tramites.db")).connect()
+    migrate_tramites(db)
+    yield db
+    db.close()
+
+
+def _import(db, text, fmt=None, batch_size=1000):
+    return import_tramites(db, read_records(io.StringIO(text), fmt), batch_size, now=1700000000)
+
+
+def test_csv_row_errors_keep_line_numbers(tramites_db):
+    text = (
+        "tipo,nombre,grado,documento\n"
+        "constancia,Ana Gómez,5°,123\n"
+        "constancia,,5°,124\n"
+        "inasistencia,Luis Pérez,3°,125,sobra\n"
+        "\n"
+        "pazysalvo,María Núñez,11°,\n"
+    )
+    result = _import(tramites_db, text)
+    assert result.inserted == 2
+    assert result.errors == [
+        {"linea": 3, "error": "Faltan campos: tipo, nombre o grado"},
+        {"linea": 4, "error": "La fila tiene más columnas que la cabecera"},
+    ]
+    rows = tramites_db.execute("SELECT id, nombre, documento FROM tramites ORDER BY id").fetchall()
+    assert [tuple(r) for r in rows] == [(result.ids[0], "Ana Gómez", "123"), (result.ids[1], "María Núñez", None)]
+
+
+def test_jsonl_row_errors(tramites_db):
+    lines = [
+        json.dumps({"tipo": "constancia", "nombre": "Ana", "grado": "5°"}),
+        "{no es json",
+        json.dumps({"tipo": {"x": 1}, "nombre": "Luis", "grado": "3°"}),
+        json.dumps(["no", "es", "objeto"]),
+        json.dumps({"tipo": "constancia", "nombre": "Sofía", "grado": "1°", "motivo": "cita médica"}),
+    ]
+    result = _import(tramites_db, "\n".join(lines) + "\n")
+    assert result.inserted == 2
+    assert [e["linea"] for e in result.errors] == [2, 3, 4]
+    assert result.errors[1]["error"] == "El campo tipo debe ser texto o número"
+    extra = tramites_db.execute("SELECT extra FROM tramites WHERE nombre = 'Sofía'").fetchone()[0]
+    assert json.loads(extra) == {"motivo": "cita médica"}
+    assert "médica" in extra
+
+
+def test_rows_sqlite_refuses_fall_back_to_row_by_row(tramites_db):
+    # Pasa la validación pero SQLite no puede guardar un texto con surrogates
+    lines = [
+        json.dumps({"tipo": "constancia", "nombre": "Ana", "grado": "5°"}),
+        '{"tipo": "constancia", "nombre": "\\ud800", "grado": "5°"}',
+        json.dumps({"tipo": "constancia", "nombre": "Luis", "grado": "3°"}),
+    ]
+    result = _import(tramites_db, "\n".join(lines), batch_size=10)
+    assert result.inserted == 2
+    assert [e["linea"] for e in result.errors] == [2]
+    assert result.errors[0]["error"].startswith("No se pudo guardar")
+    count = tramites_db.execute("SELECT COUNT(*) FROM tramites").fetchone()[0]
+    assert count == 2 and len(result.ids) == 2
+
+
+def test_batches_return_consecutive_ids(tramites_db):
+    text = "tipo,nombre,grado\n" + "".join(f"constancia,Alumno {i},5°\n" for i in range(25))
+    batches = []
+    result = import_tramites(tramites_db, read_records(io.StringIO(text)), batch_size=10,
+                             on_batch=lambda jobs, seconds: batches.append([j[0] for j in jobs]))
+    assert [len(b) for b in batches] == [10, 10, 5]
+    assert result.ids == list(range(result.ids[0], result.ids[0] + 25))
+    assert sum(batches, []) == result.ids
+
+
+@pytest.mark.parametrize("payload", [
+    None,
+    {"tipo": "constancia", "nombre": "Ana"},
+    {"tipo": "constancia", "nombre": "", "grado": "5°"},
+    ["constancia", "Ana", "5°"],
+    {"tipo": "constancia", "nombre": ["Ana"], "grado": "5°"},
+    {"tipo": "constancia", "nombre": "Ana", "grado": "5°", "documento": {"n": 1}},
+    {"tipo": "constancia", "nombre": 2**70, "grado": "5°"},
+])
+def test_validate_rejects(payload):
+    with pytest.raises(TramiteError):
+        validate_tramite(payload)
+
+
+def test_import_endpoint_reports_errors(client):
+    body = "tipo,nombre,grado\nconstancia,Ana,5°\nconstancia,,5°\n"
+    r = client.post("/api/tramites/importar", data=body.encode("utf-8"), content_type="text/csv")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["insertados"] == 1
+    assert data["errores"] == [{"linea": 3, "error": "Faltan campos: tipo, nombre o grado"}]
+
+    r = client.post("/api/tramites/importar", data=b"\xff\xfe", content_type="text/csv")
+    assert r.status_code == 400
+
+
+def test_tramite_rejects_non_scalar_fields(client):
+    r = client.post("/api/tramite", json={"tipo": "constancia", "nombre": {"x": 1}, "grado": "5"})
+    assert r.status_code == 400
@@ -0,0 +1,136 @@
+# backend/tests/test_event_logger.py
+import sqlite3
+import threading
+
+import pytest
+
+from event_logger import EventWriter
+from storage import migrate_events
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "events.db")
+    with sqlite3.connect(path) as db:
+        migrate_events(db)
+    return path
+
+
+def rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT event_type, intent, text, channel FROM events ORDER BY id").fetchall()
+
+
+def held_writer(db_path, monkeypatch, **kwargs):
+    """Escritor cuyo primer lote se queda esperando a ``release``."""
+    writer = EventWriter(db_path, batch_size=1, flush_interval=0.01, **kwargs)
+    release, writing = threading.Event(), threading.Event()
+    write = writer._write
+
+    def slow_write(db, batch):
+        writing.set()
+        release.wait(5)
+        write(db, batch)
+
+    monkeypatch.setattr(writer, "_write", slow_write)
+    return writer, release, writing
+
+
+def test_events_are_written_in_batches(db_path):
+    writer = EventWriter(db_path, batch_size=50, flush_interval=5)
+    for i in range(120):
+        assert writer.submit("user_message", intent="horario", text=f"hola {i}")
+    assert writer.flush()
+    assert len(rows(db_path)) == 120
+    stats = writer.stats()
+    assert stats["written"] == 120
+    assert stats["batches"] == 3
+    assert stats["dropped"] == stats["errors"] == 0
+    writer.close()
+
+
+def test_answers_keep_their_question(db_path):
+    writer = EventWriter(db_path)
+    writer.submit("message_received", intent="horario", text="7:00", question="¿a qué hora?")
+    writer.close()
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT question FROM events").fetchone() == ("¿a qué hora?",)
+
+
+def test_drop_policy_counts_what_does_not_fit(db_path, monkeypatch):
+    writer, release, writing = held_writer(db_path, monkeypatch, max_queue=2)
+    assert writer.submit("a")
+    assert writing.wait(5)
+    assert writer.submit("b") and writer.submit("c")
+    assert not writer.submit("d")
+    assert writer.stats()["dropped"] == 1
+    release.set()
+    writer.close()
+    assert [r[0] for r in rows(db_path)] == ["a", "b", "c"]
+
+
+def test_block_policy_gives_up_after_the_timeout(db_path, monkeypatch):
+    writer, release, writing = held_writer(db_path, monkeypatch, max_queue=1,
+                                           policy="block", block_timeout=0.05)
+    assert writer.submit("a")
+    assert writing.wait(5)
+    assert writer.submit("b")
+    assert not writer.submit("c")
+    assert writer.stats()["dropped"] == 1
+    release.set()
+    writer.close()
+    assert [r[0] for r in rows(db_path)] == ["a", "b"]
+
+
+def test_close_drains_the_queue(db_path):
+    writer = EventWriter(db_path, batch_size=1000, flush_interval=60)
+    for i in range(10):
+        writer.submit("user_message", text=str(i), channel="whatsapp")
+    writer.close()
+    assert len(rows(db_path)) == 10
+    assert rows(db_path)[0] == ("user_message", None, "0", "whatsapp")
+
+
+def test_a_row_sqlite_refuses_does_not_lose_the_batch(db_path):
+    writer = EventWriter(db_path, batch_size=10, flush_interval=60)
+    for text in ("a", "\ud800", "c", "d"):
+        writer.submit("user_message", text=text)
+    writer.close()
+    assert [r[2] for r in rows(db_path)] == ["a", "c", "d"]
+    stats = writer.stats()
+    assert (stats["written"], stats["errors"], stats["batches"]) == (3, 1, 1)
+
+
+def test_non_scalar_values_are_stored_as_json(db_path):
+    writer = EventWriter(db_path)
+    assert writer.submit("user_message", text={"x": 1}, channel=["web"], intent=2**70)
+    writer.close()
+    assert rows(db_path) == [("user_message", str(2**70), '{"x": 1}', '["web"]')]
+    assert writer.stats()["errors"] == 0
+
+
+def test_submit_after_close_is_dropped(db_path):
+    writer = EventWriter(db_path)
+    writer.submit("user_message", text="antes")
+    writer.close()
+    assert not writer.submit("user_message", text="después")
+    assert writer.stats()["dropped"] == 1
+    assert not writer.flush()
+    assert [r[2] for r in rows(db_path)] == ["antes"]
+
+    unused = EventWriter(db_path)
+    unused.close()
+    assert not unused.submit("user_message")
+    assert unused._thread is None
+
+
+def test_app_logs_non_text_channels(app_module, client):
+    client.post("/api/message", json={"text": "horario", "channel": {"id": 7}})
+    assert app_module.event_writer.flush()
+    with app_module.events_db.connection() as db:
+        row = db.execute("SELECT channel FROM events WHERE event_type = 'message_sent' ORDER BY id DESC").fetchone()
+    assert row[0] == '{"id": 7}'
+
+
+def test_unknown_policy_is_rejected(db_path):
+    with pytest.raises(ValueError):
+        EventWriter(db_path, policy="esperar")
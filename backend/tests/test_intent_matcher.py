@@ -0,0 +1,131 @@
+# backend/tests/test_intent_matcher.py
+import json
+import os
+
+import pytest
+
+from intent_matcher import IntentMatcher, IntentRouter
+
+DEFINITIONS = [
+    {"intent": "horario", "keywords": ["horario", "hora de entrada"], "reply": "7:00 am"},
+    {"intent": "matricula", "keywords": ["matrícula", "inscripción"], "reply": "enero"},
+    {"intent": "hora", "keywords": ["hora"], "reply": "son las..."},
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher(DEFINITIONS)
+
+
+@pytest.mark.parametrize("text, intents", [
+    ("¿Cuál es el horario?", {"horario", "hora"}),
+    ("¿qué hora es?", {"hora"}),
+    # Solo al inicio de palabra: "hora" no encaja en "ahora"
+    ("ahora no puedo", set()),
+    ("mi ahorario", set()),
+    ("MATRICULA abierta", {"matricula"}),
+    ("inscripcion", {"matricula"}),
+    ("rematrícula", set()),
+])
+def test_word_boundary_and_accents(matcher, text, intents):
+    assert {intent for intent, _ in matcher.match(text)} == intents
+
+
+def test_longer_keywords_score_higher(matcher):
+    assert matcher.best("¿a qué hora de entrada?") == "horario"
+    assert matcher.match("hora de entrada")[0] == ("horario", len("hora de entrada"))
+
+
+def test_first_keeps_definition_order(matcher):
+    texto = "horario de matrícula"
+    assert matcher.best(texto) == "matricula"
+    assert matcher.first(texto) == "horario"
+    assert matcher.first("nada que ver") is None
+
+
+def test_match_many(matcher):
+    assert [m[0][0] if m else None for m in matcher.match_many(["hora", "ahora", "matrícula"])] == \
+        ["hora", None, "matricula"]
+
+
+def test_router_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps(DEFINITIONS[:1]), encoding="utf-8")
+    router = IntentRouter(DEFINITIONS, source=str(path), check_interval=0)
+    assert router.current().best("horario") == "horario"
+    assert router.current().best("matrícula") is None
+
+    path.write_text(json.dumps(DEFINITIONS[1:2]), encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert router.current().best("matrícula") == "matricula"
+
+
+def test_router_keeps_serving_when_the_file_is_broken(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text("{no es json", encoding="utf-8")
+    router = IntentRouter(DEFINITIONS, source=str(path), check_interval=0)
+    assert router.current().best("horario") == "horario"
+
+
+@pytest.mark.parametrize("contenido", [
+    [{"keywords": ["horario"], "reply": "sin intent"}],
+    {"intent": "horario"},
+    [{"intent": "horario", "keywords": "horario"}],
+    ["horario"],
+])
+def test_router_keeps_the_previous_matcher_on_invalid_definitions(tmp_path, contenido):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps(DEFINITIONS[1:2]), encoding="utf-8")
+    router = IntentRouter(DEFINITIONS, source=str(path), check_interval=0)
+    assert router.current().best("matrícula") == "matricula"
+
+    path.write_text(json.dumps(contenido), encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert router.current().best("matrícula") == "matricula"
+    assert router.last_error
+    assert router._mtime == 1
+
+    path.write_text(json.dumps(DEFINITIONS[:1]), encoding="utf-8")
+    os.utime(path, (2, 2))
+    assert router.current().best("horario") == "horario"
+    assert router.last_error is None
+
+
+def test_reload_endpoint_reports_invalid_files(app_module, client, monkeypatch, tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text("[{}]", encoding="utf-8")
+    monkeypatch.setattr(app_module, "intent_router", IntentRouter(app_module.SAMPLE_RESPONSES, source=str(path)))
+    r = client.post("/api/intents/reload")
+    assert r.status_code == 500
+    assert r.get_json()["ok"] is False
+    assert r.get_json()["intents"] == len(app_module.SAMPLE_RESPONSES)
+
+
+@pytest.mark.parametrize("url", ["/api/message", "/api/message/stream"])
+def test_non_text_messages_are_rejected(client, saved_events, url):
+    r = client.post(url, json={"text": {"x": 1}})
+    assert r.status_code == 400
+    assert saved_events == []
+
+
+def test_known_intents_skip_the_model(app_module, client, saved_events, monkeypatch):
+    def no_model(texto):
+        raise AssertionError("no debería consultar al modelo")
+
+    monkeypatch.setattr(app_module, "ollama_intent", no_model)
+    r = client.post("/api/message", json={"text": "¿Cuál es el HORARIO?"})
+    assert r.get_json()["intent"] == "horario"
+    assert saved_events[-1][1]["intent"] == "horario"
+
+
+def test_classify_endpoint(client):
+    r = client.post("/api/intents/classify", json={"texts": ["horario", "nada"]})
+    assert r.status_code == 200
+    assert r.get_json()[0][0]["intent"] == "horario"
+    assert r.get_json()[1] == []
+
+
+def test_chat_answers_the_first_matching_rule(client):
+    r = client.post("/api/chat", json={"pregunta": "horario de matrícula"})
+    assert r.get_json()["respuesta"].startswith("El horario escolar")
@@ -0,0 +1,107 @@
+# backend/tests/test_listing.py
+import pytest
+
+from listing import ListingError, decode_cursor, encode_cursor
+from storage import Database
+
+
+@pytest.fixture
+def listing_dbs(app_module, monkeypatch, tmp_path):
+    """``tramites_db`` y ``events_db`` temporales, ya migrados por la app."""
+    tramites = Database(str(tmp_path / "tramites.db"), pool_size=2)
+    events = Database(str(tmp_path / "edubot.db"), pool_size=2)
+    monkeypatch.setattr(app_module, "tramites_db", tramites)
+    monkeypatch.setattr(app_module, "events_db", events)
+    monkeypatch.setattr(app_module, "tramites_fts", False)
+    app_module.init_db()
+    app_module.init_tramites_db()
+    yield tramites, events
+    tramites.close_all()
+    events.close_all()
+
+
+def _seed(database, rows):
+    with database.connection() as db:
+        ids = [db.execute("INSERT INTO tramites (tipo, nombre, grado, extra, created_at) VALUES (?, ?, ?, ?, ?)",
+                          row).lastrowid for row in rows]
+        db.commit()
+    return ids
+
+
+def _pages(client, url):
+    pages = []
+    while url:
+        r = client.get(url)
+        assert r.status_code == 200
+        pages.append(r.get_json())
+        cursor = r.headers.get("X-Next-Cursor")
+        url = f"{url.split('&cursor=')[0]}&cursor={cursor}" if cursor else None
+    return pages
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(1700000000, 42)) == (1700000000, 42)
+    with pytest.raises(ListingError):
+        decode_cursor("no-es-un-cursor")
+
+
+def test_tramites_pages_cover_everything_once(listing_dbs, client):
+    # Dos marcas de tiempo: el orden (created_at, id) también desempata por id
+    ids = _seed(listing_dbs[0], [("constancia", f"Alumno {i}", "5°", "{}", 1700000000 + 100 * (i % 2))
+                                 for i in range(13)])
+
+    pages = _pages(client, "/api/tramites?tipo=constancia&limit=5")
+    assert [len(p) for p in pages] == [5, 5, 3]
+    listed = [row["id"] for page in pages for row in page]
+    assert sorted(listed) == ids
+    assert listed == sorted(ids, key=lambda i: (1700000000 + 100 * ((i - 1) % 2), i), reverse=True)
+
+
+def test_tramites_without_limit_returns_all(listing_dbs, client):
+    ids = _seed(listing_dbs[0], [("matricula", "Ana", "1°", "{}", 1700000000)] * 3)
+    r = client.get("/api/tramites")
+    assert "X-Next-Cursor" not in r.headers
+    assert sorted(row["id"] for row in r.get_json()) == ids
+
+
+def test_tramites_filters_and_search(listing_dbs, client):
+    _seed(listing_dbs[0], [
+        ("constancia", "José Pérez", "5°", '{"motivo": "beca"}', 1739174400),
+        ("constancia", "Ana Gómez", "4°", "{}", 1739260800),
+        ("matricula", "Luis Pérez", "5°", "{}", 1739260800),
+    ])
+    names = lambda url: [row["nombre"] for row in client.get(url).get_json()]
+    assert names("/api/tramites?q=jose") == ["José Pérez"]
+    assert names("/api/tramites?q=perez&grado=5°") == ["Luis Pérez", "José Pérez"]
+    assert names("/api/tramites?q=beca") == ["José Pérez"]
+    assert names("/api/tramites?tipo=constancia&desde=2025-02-11") == ["Ana Gómez"]
+    assert names("/api/tramites?hasta=2025-02-10") == ["José Pérez"]
+
+
+def test_accented_extra_is_searchable(listing_dbs, client, saved_events):
+    r = client.post("/api/tramite", json={"tipo": "inasistencia", "nombre": "Ana", "grado": "5",
+                                          "motivo": "cita médica"})
+    assert r.status_code == 200
+    for q in ("médica", "medica", "cita med"):
+        assert [row["id"] for row in client.get(f"/api/tramites?q={q}").get_json()] == [r.get_json()["id"]]
+
+
+def test_logs_pages(listing_dbs, client):
+    with listing_dbs[1].connection() as db:
+        db.executemany("INSERT INTO events (event_type, text, channel, timestamp) VALUES (?, ?, ?, ?)",
+                       [("prueba_cursor", f"evento {i}", "tests", 1700000000000 + i // 3) for i in range(12)])
+        db.execute("INSERT INTO events (event_type, text, channel, timestamp) VALUES ('otro', 'x', 'web', 1)")
+        db.commit()
+
+    pages = _pages(client, "/api/logs?event_type=prueba_cursor&limit=5")
+    assert [len(p) for p in pages] == [5, 5, 2]
+    textos = [row["text"] for page in pages for row in page]
+    assert sorted(textos) == sorted(f"evento {i}" for i in range(12))
+    assert len(set(row["id"] for page in pages for row in page)) == 12
+    assert len(client.get("/api/logs").get_json()) == 13
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "cursor=xx", "desde=ayer"])
+def test_invalid_parameters(client, query):
+    assert client.get(f"/api/tramites?{query}").status_code == 400
+    assert client.get(f"/api/logs?{query}").status_code == 400
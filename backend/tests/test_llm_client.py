@@ -0,0 +1,102 @@
+# backend/tests/test_llm_client.py
+import threading
+import time
+
+import pytest
+
+from llm_client import ConcurrencyLimiter, LLMBusy, LLMTimeout, OllamaHTTPClient
+
+
+def _deadline(seconds=5.0):
+    return time.monotonic() + seconds
+
+
+def test_limiter_rejects_when_queue_is_full():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=0)
+    with limiter.slot(_deadline()):
+        with pytest.raises(LLMBusy):
+            with limiter.slot(_deadline()):
+                pass
+    assert limiter.stats()["rejected"] == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_limiter_times_out_waiting_for_a_slot():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    with limiter.slot(_deadline()):
+        start = time.monotonic()
+        with pytest.raises(LLMTimeout):
+            with limiter.slot(_deadline(0.05)):
+                pass
+        assert time.monotonic() - start < 1
+    assert limiter.stats() == {"max_concurrency": 1, "max_queue": 1, "in_flight": 0,
+                               "waiting": 0, "rejected": 0}
+
+
+def test_limiter_hands_over_the_slot_to_a_waiter():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with limiter.slot(_deadline()):
+            entered.set()
+            release.wait(5)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    entered.wait(5)
+    threading.Timer(0.05, release.set).start()
+    with limiter.slot(_deadline()):
+        assert limiter.in_flight == 1
+    t.join(5)
+
+
+def test_generate_against_fake_server(fake_llm):
+    client = OllamaHTTPClient(base_url=fake_llm, model="fake")
+    try:
+        prompt = "Pregunta: ¿Hay clase mañana?"
+        respuesta = client.generate(prompt)
+        assert respuesta == "Respuesta simulada sobre: ¿Hay clase mañana?. Consulta secretaría para más detalles."
+        # La conexión vuelve al pool y se reutiliza
+        assert client.generate(prompt) == respuesta
+        assert client.pool._idle.qsize() == 1
+    finally:
+        client.close()
+
+
+def test_stream_yields_the_same_answer(fake_llm):
+    client = OllamaHTTPClient(base_url=fake_llm, model="fake")
+    try:
+        prompt = "Pregunta: ¿Hay clase mañana?"
+        tokens = list(client.stream(prompt))
+        assert len(tokens) > 1
+        assert "".join(tokens) == client.generate(prompt)
+    finally:
+        client.close()
+
+
+def test_closing_a_stream_frees_the_slot(fake_llm):
+    client = OllamaHTTPClient(base_url=fake_llm, model="fake", max_concurrency=1, max_queue=0)
+    try:
+        tokens = client.stream("Pregunta: algo largo")
+        next(tokens)
+        assert client.limiter.in_flight == 1
+        tokens.close()
+        assert client.limiter.in_flight == 0
+        # La conexión a medio leer no vuelve al pool
+        assert client.pool._idle.qsize() == 0
+        assert client.generate("Pregunta: otra")
+    finally:
+        client.close()
+
+
+def test_generate_timeout(fake_llm):
+    # 11 tokens a 20 ms cada uno: no caben en 50 ms
+    client = OllamaHTTPClient(base_url=fake_llm, model="fake")
+    try:
+        with pytest.raises(LLMTimeout):
+            client.generate("Pregunta: algo lento", timeout=0.05)
+        assert client.limiter.in_flight == 0
+    finally:
+        client.close()
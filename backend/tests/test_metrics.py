@@ -0,0 +1,79 @@
+# backend/tests/test_metrics.py
+from metrics import Registry, Tracer
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    hits = registry.counter("prueba_total", "Contador de prueba", ("result",))
+    depth = registry.gauge("prueba_depth", "Gauge de prueba")
+    latency = registry.histogram("prueba_seconds", "Histograma de prueba", ("op",), buckets=(0.1, 1))
+    hits.inc(result="hit")
+    hits.inc(2, result="miss")
+    depth.set(3)
+    depth.dec()
+    latency.observe(0.05, op="leer")
+    latency.observe(0.5, op="leer")
+    latency.observe(5, op="leer")
+
+    lines = registry.render().splitlines()
+    assert "# HELP prueba_total Contador de prueba" in lines
+    assert "# TYPE prueba_total counter" in lines
+    assert 'prueba_total{result="hit"} 1' in lines
+    assert 'prueba_total{result="miss"} 2' in lines
+    assert "# TYPE prueba_depth gauge" in lines
+    assert "prueba_depth 2" in lines
+    assert "# TYPE prueba_seconds histogram" in lines
+    assert 'prueba_seconds_bucket{op="leer",le="0.1"} 1' in lines
+    assert 'prueba_seconds_bucket{op="leer",le="1"} 2' in lines
+    assert 'prueba_seconds_bucket{op="leer",le="+Inf"} 3' in lines
+    assert 'prueba_seconds_sum{op="leer"} 5.55' in lines
+    assert 'prueba_seconds_count{op="leer"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("prueba_total", "x", ("texto",)).inc(texto='di "hola"\n')
+    assert 'prueba_total{texto="di \\"hola\\"\\n"} 1' in registry.render()
+
+
+def test_a_failing_callback_does_not_break_the_scrape():
+    registry = Registry()
+    registry.callback("prueba_rota", "x", lambda: 1 / 0)
+    registry.gauge("prueba_ok", "x").set(1)
+    text = registry.render()
+    assert "# error en prueba_rota" in text
+    assert "prueba_ok 1" in text
+
+
+def test_tracer_samples_only_when_asked():
+    tracer = Tracer(sample_rate=0)
+    assert tracer.begin("GET /") is None
+    with tracer.span("fuera de traza"):
+        pass
+    token = tracer.begin("GET /", force=True)
+    with tracer.span("db"):
+        pass
+    tracer.end(token, status=200)
+    [trace] = tracer.recent()
+    assert trace["attrs"] == {"status": 200}
+    assert [s["name"] for s in trace["spans"]] == ["db"]
+
+
+def test_metrics_endpoint(client):
+    assert client.post("/api/intents/classify", json={"texts": ["horario"]}).status_code == 200
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.mimetype == "text/plain"
+    text = r.get_data(as_text=True)
+    assert "# TYPE edubot_http_request_seconds histogram" in text
+    assert 'edubot_http_request_seconds_count{endpoint="/api/intents/classify",method="POST",status="200"}' in text
+    assert "edubot_event_queue_depth" in text
+    assert 'edubot_db_connections_idle{db="tramites.db"}' in text
+
+
+def test_forced_trace_is_listed(client, saved_events):
+    client.post("/api/message", headers={"X-Trace": "1"}, json={"text": "¿cuál es el horario?"})
+    trazas = client.get("/api/trazas?limit=1").get_json()["trazas"]
+    assert trazas[0]["name"] == "POST /api/message"
+    assert trazas[0]["attrs"]["status"] == 200
+    assert "detect_intent" in [s["name"] for s in trazas[0]["spans"]]
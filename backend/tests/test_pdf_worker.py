@@ -0,0 +1,172 @@
+# backend/tests/test_pdf_worker.py
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import pdf_worker
+from pdf_worker import PdfRenderer, pdf_path_for
+from storage import Database, migrate_tramites
+
+
+def test_process_pool_renders_in_the_background(tmp_path):
+    renderer = PdfRenderer(str(tmp_path), workers=1)
+    try:
+        assert renderer.submit(1, "constancia", {"nombre": "Ana", "grado": "5°"}) == "pendiente"
+        assert renderer.wait(1, timeout=30) == "listo"
+        with open(pdf_path_for(str(tmp_path), 1), "rb") as f:
+            assert f.read(4) == b"%PDF"
+        assert renderer.pending() == 0
+
+        ok, errors = renderer.regenerate([(i, "matricula", {"nombre": f"Alumno {i}"}, None) for i in range(2, 6)])
+        assert (ok, errors) == (4, [])
+        assert all((tmp_path / f"tramite_{i}.pdf").exists() for i in range(2, 6))
+        assert not list(tmp_path.glob("*.tmp"))
+    finally:
+        renderer.shutdown()
+
+
+def test_a_broken_pool_is_replaced(tmp_path):
+    renderer = PdfRenderer(str(tmp_path), workers=1)
+    try:
+        renderer.submit(1, "constancia", {"nombre": "Ana"})
+        assert renderer.wait(1, timeout=30) == "listo"
+        executor = renderer._executor
+        for process in list(executor._processes.values()):
+            process.kill()
+        deadline = time.monotonic() + 10
+        while not executor._broken and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert renderer.submit(2, "constancia", {"nombre": "Luis"}) == "pendiente"
+        assert renderer.wait(2, timeout=30) == "listo"
+        assert renderer._executor is not executor
+    finally:
+        renderer.shutdown()
+
+
+def test_status_comes_from_the_finished_future(tmp_path):
+    # wait() puede despertar antes de que el callback saque el trabajo de _jobs
+    renderer = PdfRenderer(str(tmp_path), workers=1)
+    done, failed = Future(), Future()
+    done.set_result(pdf_path_for(str(tmp_path), 1))
+    failed.set_exception(RuntimeError("sin disco"))
+    renderer._jobs.update({1: done, 2: failed})
+    assert renderer.status(1) == "listo"
+    assert renderer.status(2) == "error"
+
+
+def test_inline_renderer(tmp_path):
+    renderer = PdfRenderer(str(tmp_path), workers=0)
+    assert renderer.submit(7, "constancia", {"nombre": "Ana"}) == "listo"
+    assert renderer.status(7) == "listo"
+    assert renderer.status(8) == "desconocido"
+
+
+@pytest.fixture
+def slow_renderer(app_module, saved_events, monkeypatch, tmp_path):
+    """Renderer de la app con hilos cuyo trabajo espera a ``release``."""
+    tramites = Database(str(tmp_path / "tramites.db"), pool_size=2)
+    with tramites.connection() as db:
+        migrate_tramites(db)
+    renderer = PdfRenderer(str(tmp_path), workers=1, use_processes=False)
+    release = threading.Event()
+    render = pdf_worker.render_tramite_pdf
+
+    def slow_render(*args):
+        release.wait(5)
+        return render(*args)
+
+    monkeypatch.setattr(pdf_worker, "render_tramite_pdf", slow_render)
+    monkeypatch.setattr(app_module, "tramites_db", tramites)
+    monkeypatch.setattr(app_module, "pdf_renderer", renderer)
+    monkeypatch.setattr(app_module, "PDF_DIR", str(tmp_path))
+    yield release
+    release.set()
+    renderer.shutdown()
+    tramites.close_all()
+
+
+def test_tramite_answers_before_the_pdf_is_ready(client, slow_renderer):
+    r = client.post("/api/tramite", json={"tipo": "constancia", "nombre": "Ana", "grado": "5"})
+    body = r.get_json()
+    assert r.status_code == 200 and body["estado"] == "pendiente"
+    tramite_id = body["id"]
+
+    assert client.get(f"/api/tramite/{tramite_id}/estado").get_json()["estado"] == "pendiente"
+    r = client.get(f"/api/descargar-pdf/{tramite_id}?espera=0")
+    assert r.status_code == 202 and r.get_json()["estado"] == "pendiente"
+
+    slow_renderer.set()
+    r = client.get(f"/api/descargar-pdf/{tramite_id}?espera=10")
+    assert r.status_code == 200 and r.data[:4] == b"%PDF"
+    assert client.get(f"/api/tramite/{tramite_id}/estado").get_json()["estado"] == "listo"
+    assert client.get("/api/descargar-pdf/999999?espera=0").status_code == 404
+
+
+def test_pdf_is_rendered_on_download_when_it_could_not_be_queued(app_module, client, saved_events,
+                                                                 monkeypatch, tmp_path):
+    tramites = Database(str(tmp_path / "tramites.db"), pool_size=2)
+    with tramites.connection() as db:
+        migrate_tramites(db)
+    renderer = PdfRenderer(str(tmp_path), workers=0)
+    monkeypatch.setattr(app_module, "tramites_db", tramites)
+    monkeypatch.setattr(app_module, "pdf_renderer", renderer)
+    monkeypatch.setattr(app_module, "PDF_DIR", str(tmp_path))
+
+    def broken_submit(*args):
+        raise OSError("no se pudo crear el pool")
+
+    monkeypatch.setattr(renderer, "submit", broken_submit)
+    r = client.post("/api/tramite", json={"tipo": "constancia", "nombre": "Ana", "grado": "5"})
+    assert r.status_code == 200 and r.get_json()["estado"] == "diferido"
+    tramite_id = r.get_json()["id"]
+    assert client.get(f"/api/tramite/{tramite_id}/estado").get_json()["estado"] == "desconocido"
+
+    monkeypatch.delattr(renderer, "submit")
+    r = client.get(f"/api/descargar-pdf/{tramite_id}?espera=0")
+    assert r.status_code == 200 and r.data[:4] == b"%PDF"
+    tramites.close_all()
+
+
+# Lo que hace multiprocessing en cada proceso del pool cuando el servidor se
+# arrancó con `python app.py`
+REIMPORT_AS_MP_MAIN = """
+import runpy, sys
+ns = runpy.run_path(sys.argv[1], run_name="__mp_main__")
+print(sorted(n for n in ("event_writer", "llm", "answer_cache", "pdf_renderer", "tramites_db") if n in ns))
+print("init_services" in ns, "app" in ns)
+"""
+
+
+def test_pool_workers_do_not_start_the_app_services(tmp_path):
+    cache_db = tmp_path / "cache.db"
+    with sqlite3.connect(cache_db) as db:
+        db.execute("CREATE TABLE answer_cache (namespace TEXT, clave TEXT, respuesta TEXT, expires_at REAL)")
+        db.execute("INSERT INTO answer_cache VALUES ('otro', 'horario', '7:00', 1e12)")
+    env = dict(os.environ, EDUBOT_DB=str(tmp_path / "edubot.db"), TRAMITES_DB=str(tmp_path / "tramites.db"),
+               PDF_DIR=str(tmp_path / "pdfs"), ANSWER_CACHE_DB=str(cache_db))
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", REIMPORT_AS_MP_MAIN, os.path.join(backend, "app.py")],
+                         cwd=backend, env=env, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.splitlines() == ["[]", "True True"]
+    assert "Cliente LLM" not in out.stderr
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache.db"]
+    with sqlite3.connect(cache_db) as db:
+        assert db.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] == 1
+
+
+def test_warm_up_loads_reportlab_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_worker, "_REPORTLAB", None)
+    pdf_worker.warm_up()
+    loaded = pdf_worker._REPORTLAB
+    assert loaded and pdf_worker._reportlab() is loaded
+    assert not list(tmp_path.iterdir())
+    pdf_worker.render_tramite_pdf(str(tmp_path), 1, "constancia", {"nombre": "Ana"})
+    assert (tmp_path / "tramite_1.pdf").read_bytes()[:4] == b"%PDF"
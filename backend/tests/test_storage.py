@@ -0,0 +1,163 @@
+# backend/tests/test_storage.py
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from pdf_worker import PdfRenderer
+from storage import Database, migrate_tramites
+
+# Esquema original de database.js (Express): sin created_at
+EXPRESS_SCHEMA = """
+    CREATE TABLE tramites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT,
+        nombre TEXT,
+        documento TEXT,
+        grado TEXT,
+        extra JSON,
+        fecha TEXT
+    )
+"""
+
+# Esquema original del backend Flask: sin documento ni fecha
+FLASK_SCHEMA = """
+    CREATE TABLE tramites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT,
+        nombre TEXT,
+        grado TEXT,
+        extra TEXT,
+        created_at INTEGER
+    )
+"""
+
+
+@pytest.fixture
+def tramites_db(tmp_path):
+    database = Database(str(tmp_path / "tramites.db"), pool_size=2)
+    yield database
+    database.close_all()
+
+
+def columns(db):
+    return {row[1] for row in db.execute("PRAGMA table_info(tramites)")}
+
+
+def test_migrates_the_express_schema(tramites_db):
+    with tramites_db.connection() as db:
+        db.execute(EXPRESS_SCHEMA)
+        db.execute("INSERT INTO tramites (tipo, nombre, fecha) VALUES ('constancia', 'Ana', '2025-02-10T08:00:00.000Z')")
+        db.commit()
+        migrate_tramites(db)
+        assert "created_at" in columns(db)
+        assert db.execute("SELECT created_at FROM tramites").fetchone()[0] == 1739174400
+
+        # Lo que sigue insertando Express (solo fecha) recibe created_at por el trigger
+        db.execute("INSERT INTO tramites (tipo, nombre, fecha) VALUES ('matricula', 'Luis', '2025-02-11T08:00:00.000Z')")
+        db.commit()
+        assert db.execute("SELECT created_at FROM tramites WHERE nombre = 'Luis'").fetchone()[0] == 1739260800
+
+
+def test_migrates_the_flask_schema(tramites_db):
+    with tramites_db.connection() as db:
+        db.execute(FLASK_SCHEMA)
+        db.execute("INSERT INTO tramites (tipo, nombre, created_at) VALUES ('constancia', 'Ana', 1739174400)")
+        db.commit()
+        migrate_tramites(db)
+        migrate_tramites(db)  # idempotente
+        assert {"documento", "fecha"} <= columns(db)
+        assert db.execute("SELECT fecha FROM tramites").fetchone()[0].startswith("2025-02-10T08:00:00")
+
+
+def test_migration_unescapes_extra_for_search(tramites_db):
+    with tramites_db.connection() as db:
+        db.execute(FLASK_SCHEMA)
+        db.execute("""INSERT INTO tramites (tipo, nombre, extra, created_at)
+                      VALUES ('inasistencia', 'Ana', '{"motivo": "cita m\\u00e9dica"}', 1739174400)""")
+        db.commit()
+        migrate_tramites(db)
+        assert db.execute("SELECT extra FROM tramites").fetchone()[0] == '{"motivo": "cita médica"}'
+        assert db.execute("SELECT rowid FROM tramites_fts WHERE tramites_fts MATCH 'medica'").fetchall()
+
+
+def test_connections_are_configured_once_and_reused(tramites_db):
+    with tramites_db.connection() as db:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    with tramites_db.connection() as again:
+        assert again is db
+    assert tramites_db.stats()["created"] == 1
+
+
+def test_connection_is_released_after_an_exception(tramites_db):
+    with tramites_db.connection() as db:
+        migrate_tramites(db)
+    with pytest.raises(RuntimeError):
+        with tramites_db.connection() as db:
+            db.execute("INSERT INTO tramites (tipo) VALUES ('constancia')")
+            raise RuntimeError("falla a mitad de la petición")
+    assert tramites_db.stats()["idle"] == 1
+    with tramites_db.connection() as db:
+        assert not db.in_transaction
+        assert db.execute("SELECT COUNT(*) FROM tramites").fetchone()[0] == 0
+
+
+def test_tramite_endpoint_uses_the_pool(app_module, client, saved_events, tramites_db, monkeypatch, tmp_path):
+    with tramites_db.connection() as db:
+        migrate_tramites(db)
+    monkeypatch.setattr(app_module, "tramites_db", tramites_db)
+    monkeypatch.setattr(app_module, "pdf_renderer", PdfRenderer(str(tmp_path), workers=0))
+
+    r = client.post("/api/tramite", json={"tipo": "constancia", "nombre": "Ana", "grado": "5",
+                                          "documento": "123"})
+    assert r.status_code == 200
+    with tramites_db.connection() as db:
+        row = db.execute("SELECT documento, fecha, created_at FROM tramites").fetchone()
+    assert row["documento"] == "123" and row["fecha"] and row["created_at"]
+    assert tramites_db.stats()["idle"] == 1
+    assert saved_events[-1][0] == "tramite_submitted"
+    assert (tmp_path / f"tramite_{r.get_json()['id']}.pdf").exists()
+
+
+# Baseline de edubot.db: sin la columna question
+OLD_EVENTS_SCHEMA = """
+    CREATE TABLE events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        intent TEXT,
+        text TEXT,
+        channel TEXT,
+        timestamp INTEGER
+    )
+"""
+
+# Como lo haría `flask run` o gunicorn: importar app sin pasar por __main__
+IMPORT_APP = """
+import app
+client = app.app.test_client()
+r = client.post("/api/tramite", json={"tipo": "constancia", "nombre": "Ana", "grado": "5", "documento": "1"})
+assert r.status_code == 200, r.get_json()
+r = client.post("/api/message", json={"text": "horario"})
+assert r.status_code == 200, r.get_json()
+app.event_writer.close()
+print(app.event_writer.stats()["written"], app.event_writer.stats()["errors"])
+"""
+
+
+def test_importing_the_app_migrates_old_databases(tmp_path):
+    for name, schema in (("edubot.db", OLD_EVENTS_SCHEMA), ("tramites.db", FLASK_SCHEMA)):
+        with sqlite3.connect(tmp_path / name) as db:
+            db.execute(schema)
+    env = dict(os.environ, EDUBOT_DB=str(tmp_path / "edubot.db"), TRAMITES_DB=str(tmp_path / "tramites.db"),
+               PDF_DIR=str(tmp_path / "pdfs"), PDF_WORKERS="0", ANSWER_CACHE_SIZE="0",
+               OLLAMA_URL="http://127.0.0.1:9")
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", IMPORT_APP], cwd=backend, env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["3", "0"]
+    with sqlite3.connect(tmp_path / "tramites.db") as db:
+        assert db.execute("SELECT documento FROM tramites").fetchone() == ("1",)
@@ -0,0 +1,55 @@
+# backend/tests/test_stream.py
+import json
+
+from llm_client import OllamaHTTPClient
+
+
+def _sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_tokens_and_done(client, saved_events):
+    pregunta = "¿Qué necesito para el paz y salvo?"
+    r = client.post("/api/ollama-chat/stream", json={"pregunta": pregunta})
+    assert r.mimetype == "text/event-stream"
+    events = _sse(r.get_data(as_text=True))
+    assert events[-1][0] == "done"
+    respuesta = events[-1][1]["respuesta"]
+    assert "".join(data["token"] for name, data in events[:-1]).strip() == respuesta
+    assert saved_events[-1] == ("ollama_answer", {"intent": "respuesta_directa", "text": respuesta,
+                                                  "question": pregunta})
+
+
+def test_cancelled_stream_is_logged(client, saved_events):
+    r = client.post("/api/ollama-chat/stream", json={"pregunta": "Cuéntame la historia del colegio"},
+                    buffered=False)
+    chunks = iter(r.response)
+    assert b"event: token" in next(chunks)
+    r.close()
+
+    event_type, fields = saved_events[-1]
+    assert (event_type, fields["intent"]) == ("ollama_answer", "cancelado")
+    assert fields["text"] and "secretaría" not in fields["text"]
+
+
+def test_model_errors_end_the_stream(app_module, client, saved_events, monkeypatch):
+    monkeypatch.setattr(app_module, "llm", OllamaHTTPClient(base_url="http://127.0.0.1:9", timeout=2))
+    r = client.post("/api/message/stream", json={"text": "hola"})
+    [(name, data)] = _sse(r.get_data(as_text=True))
+    assert name == "done" and data["intent"] == "error"
+    assert saved_events[-1][1]["intent"] == "error"
+
+
+def test_stream_trace_includes_llm_stages(client, saved_events):
+    r = client.post("/api/message/stream", json={"text": "¿Quién ganó el torneo de ajedrez?"},
+                    headers={"X-Trace": "1"})
+    r.get_data()
+    trace = next(t for t in client.get("/api/trazas").get_json()["trazas"]
+                 if t["name"] == "POST /api/message/stream")
+    spans = [s["name"] for s in trace["spans"]]
+    assert {"detect_intent", "llm.first_token", "llm"} <= set(spans)
+    assert trace["attrs"] == {"status": 200, "intent": "respuesta_directa"}
@@ -0,0 +1,35 @@
+# backend/textnorm.py
+"""Normalización de texto compartida (caché de respuestas, detección de intents)."""
+import re
+import unicodedata
+
+_NO_ALNUM = re.compile(r"[^a-z0-9ñ]+")
+
+# Palabras vacías frecuentes en las preguntas de los estudiantes
+STOPWORDS = frozenset("""
+a al algo como con cual cuales cuando de del donde el en es esta este hay la las
+lo los me mi para por que quien se si sobre su tengo un una y yo
+""".split())
+
+
+def fold_accents(text):
+    """Quita tildes y diéresis conservando la ñ."""
+    text = unicodedata.normalize("NFKD", text.replace("ñ", "\0").replace("Ñ", "\1"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.replace("\0", "ñ").replace("\1", "Ñ")
+
+
+def normalizar(text):
+    """Minúsculas, sin tildes, sin puntuación y con espacios colapsados.
+
+    Acepta cualquier valor (``None``, números...): se convierte a texto.
+    """
+    if not isinstance(text, str):
+        text = "" if text is None else str(text)
+    text = fold_accents(text.lower())
+    return _NO_ALNUM.sub(" ", text).strip()
+
+
+def tokens(text, stopwords=STOPWORDS):
+    """Conjunto de palabras significativas del texto normalizado."""
+    return {t for t in normalizar(text).split() if t not in stopwords}
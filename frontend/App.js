@@ -67,6 +67,53 @@ function addBotMessage(text) {
   scrollToBottom();
 }
 
+// Burbuja del bot que se va rellenando con los tokens del stream
+function addBotMessageStreaming() {
+  const msg = document.createElement("div");
+  msg.classList.add("message", "bot-message");
+  msg.innerHTML = `
+    <div class="bot-avatar">🤖</div>
+    <div class="bubble">
+      <span class="bubble-text"></span>
+      <span class="timestamp">${getCurrentTime()}</span>
+    </div>
+  `;
+  chatWindow.appendChild(msg);
+  scrollToBottom();
+
+  const textEl = msg.querySelector(".bubble-text");
+  return (text) => {
+    textEl.textContent = text;
+    scrollToBottom();
+  };
+}
+
+// Lee un stream SSE (event/data) y llama a onEvent por cada evento
+async function readSSE(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      raw.split("\n").forEach((line) => {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        if (line.startsWith("data: ")) data += line.slice(6);
+      });
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+}
+
 // ===============================
 // CHAT CONECTADO A BACKEND FLASK
 // ===============================
@@ -78,14 +125,22 @@ async function sendMessage() {
   input.value = "";
 
   try {
-    const r = await fetch("http://127.0.0.1:5000/api/message", {
+    const r = await fetch("http://127.0.0.1:5000/api/message/stream", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ text }),
     });
 
-    const data = await r.json();
-    addBotMessage(data.reply);
+    const update = addBotMessageStreaming();
+    let reply = "";
+    await readSSE(r, (event, data) => {
+      if (event === "token") {
+        reply += data.token;
+        update(reply);
+      } else if (event === "done") {
+        update(data.respuesta);
+      }
+    });
   } catch (error) {
     addBotMessage("⚠ Error de conexión con el servidor.");
   }